@@ -1,9 +1,13 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse
-from app.routers import flow_chat, rag_chat
-import os, json
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
+from app.routers import flow_chat, rag_chat, leads
+from app.utils.metrics import registry, http_requests, http_latency
+from app.utils import profiling
+from app.services import lifecycle
+from contextlib import asynccontextmanager
+import os, json, time, asyncio
 from typing import Any
 
 class UTF8JSONResponse(JSONResponse):
@@ -11,18 +15,44 @@ class UTF8JSONResponse(JSONResponse):
     def render(self, content: Any) -> bytes:
         return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
 
-app = FastAPI(title="AI Chatbot API", version="1.0.0", default_response_class=UTF8JSONResponse)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so the worker starts serving (/health) immediately; /ready reports progress.
+    warm = asyncio.create_task(asyncio.to_thread(lifecycle.warm_up))
+    yield
+    if not warm.done():
+        await asyncio.wait({warm}, timeout=5)
+    lifecycle.shutdown()
+
+app = FastAPI(title="AI Chatbot API", version="1.0.0", default_response_class=UTF8JSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"]
 )
 
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    if profiling.requested(request):
+        return await profiling.profile_request(request, call_next)
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", None) or "unmatched"   # route template keeps label cardinality bounded
+        http_latency.observe(time.perf_counter() - t0, method=request.method, route=path)
+        http_requests.inc(method=request.method, route=path, status=str(status))
+
 os.makedirs("data/documents", exist_ok=True)
 os.makedirs("vector_db", exist_ok=True)
 
 app.include_router(flow_chat.router)
 app.include_router(rag_chat.router)
+app.include_router(leads.router)
 
 if os.path.exists("../frontend/static"):
     app.mount("/static", StaticFiles(directory="../frontend/static"), name="static")
@@ -36,6 +66,15 @@ async def serve_frontend():
     except FileNotFoundError:
         return HTMLResponse("<h1>Frontend not found</h1>", status_code=404, media_type="text/html; charset=utf-8")
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/health")
 async def health():
     return {"status": "healthy", "charset": "utf-8", "version": "1.0.0"}
+
+@app.get("/ready")
+async def ready():
+    state = lifecycle.readiness.to_dict()
+    return UTF8JSONResponse(state, status_code=200 if lifecycle.readiness.ready else 503)
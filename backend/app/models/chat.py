@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List
 
 class ChatMessage(BaseModel):
     message: str
@@ -8,3 +8,16 @@ class ChatResponse(BaseModel):
     message: str
     session_id: str
     metadata: Optional[Dict[str, Any]] = None
+
+class BatchTurn(BaseModel):
+    session_id: str
+    message: str
+
+class BatchChatRequest(BaseModel):
+    turns: List[BatchTurn]=Field(..., min_length=1, max_length=1000)
+
+class BatchChatResult(BaseModel):
+    index: int
+    session_id: str
+    response: Optional[ChatResponse]=None
+    error: Optional[str]=None
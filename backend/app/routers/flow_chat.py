@@ -1,8 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException
-from app.models.chat import ChatMessage, ChatResponse
+from app.models.chat import ChatMessage, ChatResponse, BatchChatRequest, BatchChatResult
+from app.models.flow import FlowResponse
 from app.services.flow_service import get_flow_service, FlowService
+from app.utils.admission import flow_limiter
+from typing import Dict, List, Tuple
+import os, asyncio
 
 router=APIRouter(prefix="/flow", tags=["flow"])
+BATCH_CONCURRENCY=int(os.getenv("FLOW_BATCH_CONCURRENCY", "16"))
+
+def _chat_response(session_id: str, res: FlowResponse)->ChatResponse:
+    return ChatResponse(message=res.message, session_id=session_id, metadata={
+        "current_step":res.current_step,"next_step":res.next_step,"validation_error":res.validation_error,
+        "summary":res.summary,"is_complete":res.is_complete, **(res.metadata or {})
+    })
 
 @router.post("/start")
 async def start_flow(service: FlowService=Depends(get_flow_service)):
@@ -10,13 +21,45 @@ async def start_flow(service: FlowService=Depends(get_flow_service)):
     res=await service.get_flow_response(sid)
     return {"session_id": sid, "message": res.message, "current_step": res.current_step, "metadata": res.metadata}
 
+# Registered before /chat/{session_id} so "batch" is not captured as a session id.
+@router.post("/chat/batch", response_model=List[BatchChatResult])
+async def flow_chat_batch(req: BatchChatRequest, service: FlowService=Depends(get_flow_service)):
+    """
+    Process many turns in one request: sessions run concurrently, turns of one session run in order.
+    The whole batch takes a single flow_limiter slot (so it cannot crowd out interactive chat) and runs at
+    most FLOW_BATCH_CONCURRENCY sessions at a time.
+    """
+    by_session: Dict[str, List[Tuple[int,str]]]={}
+    for i, t in enumerate(req.turns): by_session.setdefault(t.session_id, []).append((i, t.message))
+    results: List[BatchChatResult]=[None]*len(req.turns)
+    sem=asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    def fail(sid: str, turns: List[Tuple[int,str]], err: str):
+        for i, _ in turns:
+            if results[i] is None: results[i]=BatchChatResult(index=i, session_id=sid, error=err)
+
+    async def run_session(sid: str, turns: List[Tuple[int,str]]):
+        async with sem:
+            try:
+                for i, msg in turns:
+                    res=await service.get_flow_response(sid, msg)
+                    results[i]=BatchChatResult(index=i, session_id=sid, response=_chat_response(sid, res))
+            except Exception as e: fail(sid, turns, f"Flow chat error: {e}")
+
+    async def run_all():
+        await asyncio.gather(*(run_session(sid, turns) for sid, turns in by_session.items()))
+
+    try: await flow_limiter.run_async(run_all())
+    except HTTPException as e:
+        for sid, turns in by_session.items(): fail(sid, turns, str(e.detail))
+    return results
+
 @router.post("/chat/{session_id}")
 async def flow_chat(session_id: str, message: ChatMessage, service: FlowService=Depends(get_flow_service)):
     try:
-        res=await service.get_flow_response(session_id, message.message)
-        return ChatResponse(message=res.message, session_id=session_id, metadata={
-            "current_step":res.current_step,"next_step":res.next_step,"validation_error":res.validation_error,
-            "summary":res.summary,"is_complete":res.is_complete, **(res.metadata or {})
-        })
+        res=await flow_limiter.run_async(service.get_flow_response(session_id, message.message))
+        return _chat_response(session_id, res)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, f"Flow chat error: {e}")
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, File, UploadFile, HTTPException, Query, Depends
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from app.services.flow_service import get_flow_service, FlowService
+from app.services.lead_import import import_leads
+from app.services.lead_sink import lead_sink
+import os, json, logging
+
+logger=logging.getLogger(__name__)
+router=APIRouter(prefix="/leads", tags=["leads"])
+
+@router.post("/import")
+async def import_leads_file(file: UploadFile=File(...), format: Optional[str]=Query(None, description="csv or jsonl; defaults to the file extension"),
+                            max_errors: int=Query(1000, ge=0, le=100000), service: FlowService=Depends(get_flow_service)):
+    fmt=(format or os.path.splitext(file.filename or "")[1].lstrip(".") or "").lower()
+    if fmt=="json": fmt="jsonl"
+    if fmt not in ("csv","jsonl"): raise HTTPException(400, "Upload a .csv or .jsonl file, or pass ?format=csv|jsonl")
+    try:
+        return await run_in_threadpool(import_leads, file.file, fmt, service.options, max_errors=max_errors)
+    except Exception as e:
+        logger.error(f"Lead import error: {e}")
+        raise HTTPException(500, f"Lead import error: {e}")
+
+@router.get("/export")
+async def export_leads(after_id: int=Query(0, ge=0, description="return leads with id greater than this (use the last id of the previous page)"),
+                       limit: int=Query(1000, ge=1, le=10000)):
+    """Completed flow leads as JSON Lines, one page at a time in id order."""
+    lines=(json.dumps(lead, ensure_ascii=False)+"\n" for lead in lead_sink.export(after_id, limit))
+    return StreamingResponse(lines, media_type="application/x-ndjson; charset=utf-8")
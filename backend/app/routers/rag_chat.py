@@ -1,8 +1,13 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, File, UploadFile, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
 from app.models.chat import ChatMessage, ChatResponse
-from app.services.rag_service import rag_service
-from typing import List
-import uuid, os, logging
+from app.services.rag_service import rag_service, validate_collection, DEFAULT_COLLECTION
+from app.services.ingest_jobs import ingest_queue
+from app.services.retrieval import retrieve, drop_vectors, MODES
+from app.services.query_cache import query_cache
+from app.utils.admission import rag_limiter
+from typing import List, Optional
+import uuid, os, asyncio, hashlib, logging, tempfile
 
 logger=logging.getLogger(__name__)
 router=APIRouter(prefix="/rag", tags=["rag"])
@@ -12,40 +17,108 @@ async def start_rag():
     sid=str(uuid.uuid4())
     return {"session_id":sid, "message":"RAG ready. Upload documents using the button above, then ask questions.", "mode":"rag"}
 
+MAX_UPLOAD_BYTES=int(os.getenv("MAX_UPLOAD_MB", "100"))*1024*1024
+UPLOAD_BLOCK=1024*1024
+
+async def _save_stream(f: UploadFile, path: str)->str:
+    """
+    Copy an upload to `path` in fixed-size blocks, hashing as it goes; the partial file is removed if it exceeds the limit.
+    Each upload writes its own temp file (concurrent uploads of one name cannot mix) and disk writes run off the event loop.
+    """
+    fd, tmp=tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-", suffix=".part"); size=0; h=hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            while block:=await f.read(UPLOAD_BLOCK):
+                size+=len(block)
+                if size>MAX_UPLOAD_BYTES: raise ValueError(f"Too large {f.filename}")
+                await run_in_threadpool(fh.write, block); h.update(block)
+        os.replace(tmp, path)
+        return h.hexdigest()
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+
+def _collection(name: Optional[str])->str:
+    try: return validate_collection(name)
+    except ValueError as e: raise HTTPException(400, str(e))
+
+async def _require_writer(collection: str):
+    """Uploads and deletes go to the worker process that writes the collection's store; other workers answer 503."""
+    writer=await run_in_threadpool(rag_service.writer, collection)
+    if writer: raise HTTPException(503, f"Collection {collection} is written by worker pid {writer}; retry the request")
+
+def _upload_folder(collection: str)->str:
+    return "data/documents" if collection==DEFAULT_COLLECTION else os.path.join("data/documents", "collections", collection)
+
 @router.post("/upload")
-async def upload(files: List[UploadFile]=File(...)):
+async def upload(files: List[UploadFile]=File(...), collection: Optional[str]=Query(None)):
     if not files: raise HTTPException(400, "No files uploaded")
-    saved=[]
-    os.makedirs("data/documents", exist_ok=True)
+    collection=_collection(collection)
+    await _require_writer(collection)
+    saved=[]; hashes={}
+    folder=_upload_folder(collection)
+    os.makedirs(folder, exist_ok=True)
     errors=[]
     for f in files:
         try:
             if f.content_type not in ["application/pdf","text/plain"]:
                 errors.append(f"Invalid type {f.filename}: {f.content_type}"); continue
-            data=await f.read()
-            if len(data)>10*1024*1024: errors.append(f"Too large {f.filename}"); continue
             safe="".join(ch for ch in f.filename if ch.isalnum() or ch in ".-_")
-            path=os.path.join("data/documents", safe or f"file_{uuid.uuid4().hex}.bin")
-            if f.content_type=="text/plain":
-                try:
-                    text=data.decode("utf-8")
-                except UnicodeDecodeError:
-                    text=data.decode("latin-1", errors="ignore")
-                with open(path, "w", encoding="utf-8") as fh: fh.write(text)
-            else:
-                with open(path, "wb") as fh: fh.write(data)
+            path=os.path.join(folder, safe or f"file_{uuid.uuid4().hex}.bin")
+            hashes[path]=await _save_stream(f, path)
             saved.append(path)
             logger.info(f"Saved {path}")
+        except ValueError as e:
+            errors.append(str(e))
         except Exception as e:
             errors.append(f"{f.filename}: {e}")
     if not saved and errors: raise HTTPException(400, f"Upload errors: {'; '.join(errors)}")
-    results=rag_service.add_documents(saved)
-    return {"message":"Uploaded", "processed_files":results, "total_chunks":sum(results.values()), "errors": errors or None}
+    job=await run_in_threadpool(ingest_queue.submit, saved, collection, hashes)   # manifest checks may load a cold collection
+    return {"message":"Upload queued for indexing", "job_id":job.job_id, "collection":collection, "status":job.status, "files":[os.path.basename(p) for p in saved], "errors": errors or None}
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job=ingest_queue.get(job_id)
+    if not job: raise HTTPException(404, f"Unknown job {job_id}")
+    return job.to_dict()
+
+@router.get("/cache/stats")
+async def cache_stats():
+    return {**query_cache.stats(), "collections":rag_service.stats()}
+
+@router.get("/collections")
+async def list_collections():
+    return {"collections":rag_service.collections(), **rag_service.stats()}
+
+@router.get("/documents")
+async def list_documents(collection: Optional[str]=Query(None)):
+    collection=_collection(collection)
+    docs=await run_in_threadpool(rag_service.documents, collection)
+    return {"collection":collection, "documents":docs, "count":len(docs)}
+
+@router.delete("/documents/{name}")
+async def delete_document(name: str, collection: Optional[str]=Query(None)):
+    collection=_collection(collection)
+    await _require_writer(collection)
+    removed=await run_in_threadpool(rag_service.delete_document, name, collection)
+    if removed is None: raise HTTPException(404, f"Unknown document {name} in collection {collection}")
+    try: vectors=await run_in_threadpool(drop_vectors, name, collection)
+    except Exception as e:
+        logger.error(f"Vector removal error {name}: {e}"); vectors=None   # still filtered out of results at query time
+    path=os.path.join(_upload_folder(collection), name)
+    if os.path.basename(name)==name and os.path.isfile(path): os.remove(path)
+    return {"collection":collection, "document":name, "deleted_chunks":removed, "deleted_vectors":vectors}
 
 @router.post("/chat/{session_id}")
-async def rag_chat(session_id: str, message: ChatMessage):
+async def rag_chat(session_id: str, message: ChatMessage, collection: Optional[str]=Query(None), mode: Optional[str]=Query(None)):
+    collection=_collection(collection)
+    if mode and mode not in MODES: raise HTTPException(400, f"Unknown mode {mode}; use one of {', '.join(MODES)}")
     try:
-        ans=rag_service.query(message.message)
-        return ChatResponse(message=ans, session_id=session_id, metadata={"mode":"rag"})
+        res=await rag_limiter.run_async(retrieve(message.message, collection=collection, mode=mode))
+        return ChatResponse(message=res["answer"], session_id=session_id,
+                            metadata={"mode":"rag", "collection":collection, "retrieval":res["mode"], "sources":res["sources"], "retrievers":res["retrievers"]})
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError as e:
+        raise HTTPException(504, str(e))
     except Exception as e:
         raise HTTPException(500, f"RAG chat error: {e}")
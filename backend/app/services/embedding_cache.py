@@ -0,0 +1,104 @@
+import hashlib
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent content-hash -> embedding cache backed by SQLite.
+
+    Vectors are stored as raw float32 bytes, namespaced by model so switching
+    models never returns vectors from a different embedding space, and are returned
+    as float32 arrays (never as lists of Python floats).
+    """
+    def __init__(self, path: str, namespace: str):
+        self.path = path
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (ns TEXT, hash TEXT, vec BLOB, PRIMARY KEY (ns, hash))"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def _iter_many(self, hashes: Sequence[str]) -> Iterator[Tuple[str, np.ndarray]]:
+        for i in range(0, len(hashes), 500):
+            part = list(hashes[i:i + 500])
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT hash, vec FROM embeddings WHERE ns=? AND hash IN ({','.join('?' * len(part))})",
+                    [self.namespace, *part],
+                ).fetchall()
+            for h, vec in rows:
+                yield h, np.frombuffer(vec, dtype=np.float32)
+
+    def get_many(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        return dict(self._iter_many(hashes))
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (ns, hash, vec) VALUES (?, ?, ?)",
+                [(self.namespace, h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in items.items()],
+            )
+            self._conn.commit()
+
+    def embed(
+        self,
+        texts: Sequence[str],
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        batch_size: int = 256,
+        hashes: Optional[Sequence[str]] = None,
+    ) -> np.ndarray:
+        """
+        Return a float32 matrix with one row per text, calling `embed_fn` only for unseen texts, in batches.
+        Rows are written straight into the matrix, so no per-vector copies are kept alongside it.
+        """
+        hashes = list(hashes) if hashes is not None else [text_hash(t) for t in texts]
+        rows: Dict[str, List[int]] = {}
+        for j, h in enumerate(hashes):
+            rows.setdefault(h, []).append(j)
+        out: Optional[np.ndarray] = None
+
+        def fill(h: str, vec: np.ndarray):
+            nonlocal out
+            if out is None:
+                out = np.empty((len(hashes), len(vec)), dtype=np.float32)
+            out[rows[h]] = vec
+
+        found = set()
+        for h, vec in self._iter_many(sorted(rows)):
+            fill(h, vec)
+            found.add(h)
+        pending = [(h, texts[js[0]]) for h, js in rows.items() if h not in found]
+        self.hits += sum(len(rows[h]) for h in found)
+        self.misses += len(pending)
+        for i in range(0, len(pending), batch_size):
+            batch = pending[i:i + batch_size]
+            vecs = np.asarray(embed_fn([t for _, t in batch]), dtype=np.float32)
+            new = {h: v for (h, _), v in zip(batch, vecs)}
+            self.put_many(new)
+            for h, v in new.items():
+                fill(h, v)
+        if pending:
+            logger.info(f"Embedded {len(pending)} new chunks ({len(hashes) - len(pending)} served from cache)")
+        return out if out is not None else np.empty((0, 0), dtype=np.float32)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
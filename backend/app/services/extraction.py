@@ -0,0 +1,102 @@
+from typing import Dict, Iterable, Iterator, List, Tuple
+import os, re, json, time, codecs, hashlib
+
+# Runs inside ingestion worker processes: keep this module free of import-time side effects.
+# Everything below is a generator pipeline (pages -> normalized text -> sentences -> chunks)
+# so memory stays bounded by one page/chunk regardless of document size.
+
+TEXT_BLOCK=64*1024
+WS_RE=re.compile(r'\s+')
+SENTENCE_RE=re.compile(r'(?<=[.!?])\s+')
+
+def file_hash(path: str)->str:
+    h=hashlib.sha256()
+    with open(path, 'rb') as f:
+        while block:=f.read(TEXT_BLOCK): h.update(block)
+    return h.hexdigest()
+
+def _text_encoding(path: str)->str:
+    dec=codecs.getincrementaldecoder("utf-8")()
+    try:
+        with open(path, 'rb') as f:
+            while block:=f.read(TEXT_BLOCK): dec.decode(block)
+        dec.decode(b"", final=True)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+def iter_pages(path: str)->Iterator[str]:
+    if path.lower().endswith(".txt"):
+        with open(path, 'r', encoding=_text_encoding(path), errors='ignore') as f:
+            while block:=f.read(TEXT_BLOCK): yield block
+    elif path.lower().endswith(".pdf"):
+        try:
+            import PyPDF2
+        except ImportError:
+            yield f"PDF {os.path.basename(path)} (install PyPDF2 for full extraction)"; return
+        with open(path, 'rb') as f:
+            for pg in PyPDF2.PdfReader(f).pages: yield (pg.extract_text() or "") + "\n"
+
+def normalize(pages: Iterable[str])->Iterator[str]:
+    for p in pages:
+        p=WS_RE.sub(' ', p)
+        if p.strip(): yield p
+
+def iter_sentences(texts: Iterable[str])->Iterator[str]:
+    tail=""
+    for t in texts:
+        if tail.endswith(' ') and t.startswith(' '): t=t[1:]
+        parts=SENTENCE_RE.split(tail+t)
+        tail=parts.pop()
+        for s in parts:
+            if s.strip(): yield s.strip()
+        if len(tail)>TEXT_BLOCK: yield tail.strip(); tail=""
+    if tail.strip(): yield tail.strip()
+
+def chunk_sentences(sentences: Iterable[str], size: int=900, overlap: int=150)->Iterator[str]:
+    buf: List[str]=[]; n=0
+    for s in sentences:
+        while len(s)>size:
+            if buf: yield " ".join(buf); buf=[]; n=0
+            yield s[:size]; s=s[size-overlap:]
+        if buf and n+1+len(s)>size:
+            yield " ".join(buf)
+            keep=[]; k=0
+            for prev in reversed(buf):
+                if k+len(prev)+1>overlap: break
+                keep.insert(0, prev); k+=len(prev)+1
+            buf=keep; n=max(k-1, 0)
+            if buf and n+1+len(s)>size: buf=[]; n=0
+        n+=len(s)+(1 if buf else 0); buf.append(s)
+    if buf: yield " ".join(buf)
+
+def _timed(it: Iterable[str], acc: Dict[str,float], key: str)->Iterator[str]:
+    """Pass items through, adding the time spent producing them (upstream included) to acc[key]."""
+    it=iter(it); acc.setdefault(key, 0.0)
+    while True:
+        t0=time.perf_counter()
+        try: item=next(it)
+        except StopIteration: acc[key]+=time.perf_counter()-t0; return
+        acc[key]+=time.perf_counter()-t0
+        yield item
+
+def spool_chunks(path: str, spool: str, size: int=900, overlap: int=150)->Tuple[int, Dict[str,float]]:
+    """
+    Stream chunks of `path` into a JSONL spool file.
+    Returns the chunk count and the seconds spent in each stage (extract, normalize, chunk, spool).
+    """
+    n=0; cum: Dict[str,float]={}; t0=time.perf_counter()
+    pages=_timed(iter_pages(path), cum, "extract")
+    texts=_timed(normalize(pages), cum, "normalize")
+    chunks=_timed(chunk_sentences(iter_sentences(texts), size, overlap), cum, "chunk")
+    with open(spool, 'w', encoding='utf-8') as out:
+        for c in chunks:
+            out.write(json.dumps(c, ensure_ascii=False)+"\n"); n+=1
+    total=time.perf_counter()-t0
+    # each wrapper's time includes its upstream stages; subtract to get exclusive per-stage time
+    return n, {"extract":cum["extract"], "normalize":cum["normalize"]-cum["extract"],
+               "chunk":cum["chunk"]-cum["normalize"], "spool":total-cum["chunk"]}
+
+def read_spool(spool: str)->Iterator[str]:
+    with open(spool, 'r', encoding='utf-8') as f:
+        for line in f: yield json.loads(line)
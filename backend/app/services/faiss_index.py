@@ -0,0 +1,99 @@
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+QUANTIZATIONS = (None, "sq8", "pq")
+PQ_MIN_TRAIN = 39 * 256  # faiss wants ~39 points per centroid; PQ uses 256 centroids per sub-quantizer
+
+
+def index_spec(
+    index_type: str = "flat",
+    quantization: Optional[str] = None,
+    n: int = 0,
+    nlist: int = 1024,
+    hnsw_m: int = 32,
+    pq_m: int = 16,
+    dim: int = 384,
+) -> str:
+    """
+    Build a faiss.index_factory string for the given index type and optional quantization.
+    `n` is the number of training vectors available; nlist and PQ are scaled down for small corpora.
+    """
+    index_type = (index_type or "flat").lower()
+    quantization = (quantization or "").lower() or None
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization {quantization!r}; expected sq8 or pq")
+    if quantization == "pq":
+        if n and n < PQ_MIN_TRAIN:
+            logger.warning(f"PQ needs >= {PQ_MIN_TRAIN} training vectors, got {n}; using SQ8 instead")
+            quantization = "sq8"
+        elif dim % pq_m:
+            raise ValueError(f"pq_m={pq_m} must divide the embedding dimension {dim}")
+
+    if index_type == "flat":
+        return {None: "Flat", "sq8": "SQ8", "pq": f"PQ{pq_m}"}[quantization]
+    if index_type == "hnsw":
+        return {None: f"HNSW{hnsw_m}", "sq8": f"HNSW{hnsw_m}_SQ8", "pq": f"HNSW{hnsw_m}_PQ{pq_m}"}[quantization]
+    if n:
+        nlist = max(1, min(nlist, n // 39))
+    return f"IVF{nlist}," + {None: "Flat", "sq8": "SQ8", "pq": f"PQ{pq_m}"}[quantization]
+
+
+def train_index(vectors: np.ndarray, spec: str) -> faiss.Index:
+    """Create an empty index for `spec`, training it on `vectors` if the index type requires it."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = faiss.index_factory(vectors.shape[1], spec)
+    if not index.is_trained:
+        index.train(vectors)
+    return index
+
+
+def build_index(vectors: np.ndarray, spec: str) -> faiss.Index:
+    """Create, train (if required) and fill an index from float32 vectors."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = train_index(vectors, spec)
+    index.add(vectors)
+    return index
+
+
+def tune(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> faiss.Index:
+    """Apply search-time parameters (IVF nprobe, HNSW efSearch) where the index supports them."""
+    ps = faiss.ParameterSpace()
+    for name, value in (("nprobe", nprobe), ("efSearch", ef_search)):
+        if value is None:
+            continue
+        try:
+            ps.set_index_parameter(index, name, value)
+        except RuntimeError:
+            pass
+    return index
+
+
+def default_nprobe(index: faiss.Index) -> Optional[int]:
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
+    return max(1, int(math.sqrt(ivf.nlist)))
+
+
+def read_index(path: str, mmap: bool = False) -> faiss.Index:
+    """Read an index, memory-mapping it read-only when requested and supported."""
+    if mmap:
+        try:
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            logger.warning(f"mmap load not supported for {path} ({e}); loading into RAM")
+    return faiss.read_index(path)
+
+
+def describe(index: faiss.Index) -> str:
+    return type(faiss.downcast_index(index)).__name__
@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import atexit
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def atomic_write(path: str, write: Callable[[str], None]):
+    """Call write(tmp_path), fsync the result and rename it over `path`."""
+    tmp = f"{path}.tmp-{os.getpid()}"
+    try:
+        write(tmp)
+        with open(tmp, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class WriteAheadLog:
+    """
+    JSON-lines log of vector additions that are not yet in a snapshot.
+
+    Records are appended and fsynced before the in-memory index changes. After a snapshot
+    the log is cut at the offset that snapshot covered; a torn last line is ignored on read.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fh = open(path, "ab")
+
+    def append(self, records: List[Dict[str, Any]]):
+        if not records:
+            return
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        with self._lock:
+            self._fh.write(data)
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+
+    def tell(self) -> int:
+        with self._lock:
+            return self._fh.tell()
+
+    def read(self) -> Iterator[Dict[str, Any]]:
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.warning(f"Ignoring torn record at the end of {self.path}")
+                    return
+
+    def truncate_before(self, offset: int):
+        """Drop the first `offset` bytes (records already captured by a snapshot), keeping later appends."""
+        with self._lock:
+            self._fh.close()
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                tail = f.read()
+
+            def write(tmp: str):
+                with open(tmp, "wb") as out:
+                    out.write(tail)
+
+            atomic_write(self.path, write)
+            self._fh = open(self.path, "ab")
+
+    def close(self):
+        with self._lock:
+            self._fh.close()
+
+
+class SnapshotManager:
+    """
+    Coalesces snapshot requests and writes them from a background thread.
+
+    request() marks the store dirty; a snapshot runs once no request has arrived for
+    `debounce` seconds, or at the latest `max_delay` seconds after the first pending one.
+    capture() is expected to return a consistent copy (taken under the owner's lock) that
+    write() then serializes without blocking readers or writers.
+    """
+
+    def __init__(
+        self,
+        capture: Callable[[], Any],
+        write: Callable[[Any], None],
+        debounce: float = 2.0,
+        max_delay: float = 30.0,
+        name: str = "faiss-snapshot",
+    ):
+        self.capture = capture
+        self.write = write
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.name = name
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._first: Optional[float] = None
+        self._last: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+        self.snapshots = 0
+        self.failed = 0
+        self.last_seconds = 0.0
+
+    def request(self):
+        with self._cond:
+            now = time.monotonic()
+            self._last = now
+            if self._first is None:
+                self._first = now
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+            self._cond.notify()
+
+    @property
+    def pending(self) -> bool:
+        return self._first is not None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._first is None and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return
+                due = min(self._last + self.debounce, self._first + self.max_delay)
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                self._first = self._last = None
+            self._snapshot()
+
+    def _snapshot(self):
+        with self._write_lock:
+            t0 = time.perf_counter()
+            try:
+                state = self.capture()
+                if state is not None:
+                    self.write(state)
+                    self.snapshots += 1
+                self.last_seconds = time.perf_counter() - t0
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"{self.name} failed: {e}")
+                with self._cond:  # retry after the debounce interval
+                    now = time.monotonic()
+                    self._first = self._first or now
+                    self._last = now
+                    self._cond.notify()
+
+    def flush(self):
+        """Write a snapshot now (in the caller's thread) if anything is pending."""
+        with self._cond:
+            if self._first is None:
+                return
+            self._first = self._last = None
+        self._snapshot()
+
+    def close(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self.pending,
+            "snapshots": self.snapshots,
+            "failed": self.failed,
+            "last_seconds": round(self.last_seconds, 4),
+            "debounce_s": self.debounce,
+            "max_delay_s": self.max_delay,
+        }
@@ -1,9 +1,14 @@
-from typing import Optional, Dict, Any, List
-from datetime import datetime, timedelta
-import uuid, logging
+from typing import Optional, Dict, Any, Deque, Tuple
+from collections import deque
+from datetime import datetime
+import os, time, uuid, asyncio, logging
 from enum import Enum
 from app.models.flow import FlowData, FlowResponse, FlowStep
 from app.utils.validation import ValidationUtils, sanitize_input
+from app.services.session_store import SessionStore, make_session_store
+from app.utils.admission import offload
+from app.services.lead_sink import lead_sink
+from app.utils.metrics import registry, flow_transitions, flow_validation_failures
 
 logger=logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -12,29 +17,32 @@ class SessionStatus(Enum):
     ACTIVE="active"; COMPLETED="completed"; EXPIRED="expired"; ERROR="error"
 
 class FlowSession:
+    __slots__=("session_id","flow_data","created_at","last_activity","status","retry_count","history","metadata")
+    HISTORY_LIMIT=20
     def __init__(self, session_id: str):
         self.session_id=session_id
         self.flow_data=FlowData(step=FlowStep.START)
-        self.created_at=datetime.utcnow()
-        self.last_activity=datetime.utcnow()
+        self.created_at=time.monotonic()
+        self.last_activity=self.created_at
         self.status=SessionStatus.ACTIVE
         self.retry_count=0
-        self.history: List[Dict[str, Any]]=[]
+        self.history: Deque[Tuple[float,str,str,str,int]]=deque(maxlen=self.HISTORY_LIMIT)
         self.metadata: Dict[str, Any]={}
-    def touch(self): self.last_activity=datetime.utcnow()
-    def expired(self, minutes=30)->bool: return datetime.utcnow()>self.last_activity+timedelta(minutes=minutes)
+    def touch(self): self.last_activity=time.monotonic()
+    def expired(self, minutes=30)->bool: return time.monotonic()>self.last_activity+minutes*60
     def inc_retry(self): self.retry_count+=1
     def reset_retry(self): self.retry_count=0
-    def add(self, u, b, step): self.history.append({"ts":datetime.utcnow().isoformat(),"u":u,"b":b,"step":step,"retries":self.retry_count})
+    def add(self, u, b, step): self.history.append((time.monotonic(), u, b, step, self.retry_count))
 
 class FlowService:
-    def __init__(self, timeout=30, max_retries=3):
-        self.sessions: Dict[str, FlowSession]={}
+    def __init__(self, timeout=30, max_retries=3, max_sessions=int(os.getenv("FLOW_MAX_SESSIONS", "100000")), store: Optional[SessionStore]=None):
         self.timeout=timeout
         self.max_retries=max_retries
+        self.max_sessions=max_sessions
+        self.store=store or make_session_store(timeout*60, max_sessions)
         self.messages=self._msgs()
         self.options=['consulting','development','support','training','maintenance']
-        logger.info(f"FlowService initialized with {timeout}min timeout, {max_retries} max retries")
+        logger.info(f"FlowService initialized with {timeout}min timeout, {max_retries} max retries, {max_sessions} max sessions, {type(self.store).__name__}")
 
     def _msgs(self)->Dict[FlowStep, Dict[str,str]]:
         return {
@@ -47,22 +55,32 @@ class FlowService:
         }
 
     async def create_session(self)->str:
-        sid=str(uuid.uuid4()); self.sessions[sid]=FlowSession(sid); logger.info(f"Created new session: {sid}"); return sid
+        sid=str(uuid.uuid4()); self.store.put(FlowSession(sid)); logger.info(f"Created new session: {sid}"); return sid
 
     async def _get_or_create(self, sid: str)->FlowSession:
-        s=self.sessions.get(sid) or FlowSession(sid); self.sessions[sid]=s
+        s=(await asyncio.to_thread(self.store.get, sid) if self.store.blocking else self.store.get(sid)) or FlowSession(sid)
         if s.expired(self.timeout): s.status=SessionStatus.EXPIRED
+        s.touch()
         return s
 
     async def get_flow_response(self, sid: str, user_input: str=None)->FlowResponse:
-        s=await self._get_or_create(sid)
+        s=await self._get_or_create(sid); prev=s.flow_data.step
+        try: return await self._respond(s, user_input)
+        finally:
+            self.store.put(s)
+            if s.flow_data.step!=prev: flow_transitions.inc(from_step=prev.value, to_step=s.flow_data.step.value)
+
+    async def _respond(self, s: FlowSession, user_input: str=None)->FlowResponse:
         if s.status!=SessionStatus.ACTIVE: return await self._inactive(s)
         s.touch()
 
         if user_input:
-            user_input=sanitize_input(user_input)
-            err=await self._validate_and_update(s, user_input)
+            step=s.flow_data.step
+            user_input, update, err=await offload(self._validate, step, user_input)
+            if s.flow_data.step!=step: return await self._next(s, user_input)   # a concurrent turn moved the session on
+            if update: self._apply(s, *update)
             if err:
+                flow_validation_failures.inc(step=s.flow_data.step.value)
                 s.add(user_input, err, s.flow_data.step.value); s.inc_retry()
                 if s.retry_count>=self.max_retries: return await self._maxed(s)
                 return FlowResponse(message=err, current_step=s.flow_data.step.value, validation_error=err, metadata={"retry_count":s.retry_count,"max_retries":self.max_retries})
@@ -84,25 +102,32 @@ class FlowService:
         s.flow_data=FlowData(step=FlowStep.START); s.status=SessionStatus.ACTIVE; s.reset_retry()
         return FlowResponse(message="Too many attempts. Let's start fresh. What's your name?", current_step=FlowStep.NAME.value, next_step=FlowStep.EMAIL.value, validation_error="max_retries", metadata={"previous_step":prev.value})
 
-    async def _validate_and_update(self, s: FlowSession, text: str)->Optional[str]:
-        fd=s.flow_data; st=fd.step
+    def _validate(self, st: FlowStep, text: str)->Tuple[str, Optional[Tuple[str, str, FlowStep]], Optional[str]]:
+        """Sanitize and validate input for step `st` (CPU-bound; runs on the cpu pool and never touches the session).
+        Returns (text, (field, value, next step) or None, error)."""
+        text=sanitize_input(text)
         if st==FlowStep.NAME:
             v=ValidationUtils.validate_name(text)
-            if not v['is_valid']: return f"❌ {v['message']} • {self.messages[FlowStep.NAME]['hint']}"
-            fd.name=v['normalized_name']; fd.step=FlowStep.EMAIL; logger.info(f"{s.session_id}: name OK {fd.name}")
-        elif st==FlowStep.EMAIL:
+            if not v['is_valid']: return text, None, f"❌ {v['message']} • {self.messages[FlowStep.NAME]['hint']}"
+            return text, ("name", v['normalized_name'], FlowStep.EMAIL), None
+        if st==FlowStep.EMAIL:
             v=ValidationUtils.validate_email(text)
-            if not v['is_valid']: return f"❌ {v['message']} • {self.messages[FlowStep.EMAIL]['hint']}"
-            fd.email=v['normalized_email']; fd.step=FlowStep.PHONE; logger.info(f"{s.session_id}: email OK {fd.email}")
-        elif st==FlowStep.PHONE:
+            if not v['is_valid']: return text, None, f"❌ {v['message']} • {self.messages[FlowStep.EMAIL]['hint']}"
+            return text, ("email", v['normalized_email'], FlowStep.PHONE), None
+        if st==FlowStep.PHONE:
             v=ValidationUtils.validate_phone(text)
-            if not v['is_valid']: return f"❌ {v['message']} • {self.messages[FlowStep.PHONE]['hint']}"
-            fd.phone=v['formatted_phone'] or text; fd.step=FlowStep.SERVICE; logger.info(f"{s.session_id}: phone OK {fd.phone}")
-        elif st==FlowStep.SERVICE:
+            if not v['is_valid']: return text, None, f"❌ {v['message']} • {self.messages[FlowStep.PHONE]['hint']}"
+            return text, ("phone", v['formatted_phone'] or text, FlowStep.SERVICE), None
+        if st==FlowStep.SERVICE:
             v=ValidationUtils.validate_service_selection(text, self.options)
-            if not v['is_valid']: return f"❌ {v['message']} • {self.messages[FlowStep.SERVICE]['hint']}"
-            fd.service=v['normalized_service']; fd.step=FlowStep.SUMMARY; logger.info(f"{s.session_id}: service OK {fd.service}")
-        return None
+            if not v['is_valid']: return text, None, f"❌ {v['message']} • {self.messages[FlowStep.SERVICE]['hint']}"
+            return text, ("service", v['normalized_service'], FlowStep.SUMMARY), None
+        return text, None, None
+
+    def _apply(self, s: FlowSession, field: str, value: str, step: FlowStep):
+        """Record a validated answer and advance the session; runs on the event loop."""
+        setattr(s.flow_data, field, value); s.flow_data.step=step
+        logger.info(f"{s.session_id}: {field} OK {value}")
 
     async def _next(self, s: FlowSession, user_input: str=None)->FlowResponse:
         fd=s.flow_data; st=fd.step; m=self.messages
@@ -124,10 +149,12 @@ class FlowService:
             s.status=SessionStatus.COMPLETED
             summary={"name":fd.name,"email":fd.email,"phone":fd.phone,"service":fd.service,"session_id":s.session_id,"completed_at":datetime.utcnow().isoformat()}
             s.metadata['final_summary']=summary
+            lead_sink.submit(summary)
             msg=f"{m[FlowStep.SERVICE]['success'].format(service=fd.service)}\n\n{m[FlowStep.SUMMARY]['complete']}"
             s.add(user_input or "", msg, st.value)
             return FlowResponse(message=msg, current_step=FlowStep.SUMMARY.value, summary=summary, is_complete=True, metadata={"session_completed":True})
         return FlowResponse(message="Let's start over. What's your name?", current_step=FlowStep.NAME.value, validation_error="unknown_state")
         
 flow_service=FlowService()
+registry.gauge("flow_sessions", "Sessions held by the flow session store", fn=lambda: len(flow_service.store))
 async def get_flow_service()->FlowService: return flow_service
@@ -0,0 +1,130 @@
+from typing import Dict, List, Optional, Any
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+import os, time, uuid, logging, tempfile, threading, multiprocessing
+from app.services.extraction import spool_chunks, read_spool
+from app.services.rag_service import rag_service, CollectionManager, DEFAULT_COLLECTION
+from app.services.retrieval import index_vectors
+from app.utils.metrics import ingest_stage, ingest_files, ingest_chunks
+
+logger=logging.getLogger(__name__)
+
+DONE=("indexed","unchanged","failed")
+
+class IngestJob:
+    def __init__(self, paths: List[str], collection: str=DEFAULT_COLLECTION, hashes: Optional[Dict[str,str]]=None):
+        self.job_id=uuid.uuid4().hex
+        self.collection=collection
+        self.hashes=hashes or {}
+        self.status="queued"
+        self.files: Dict[str, Dict[str, Any]]={p: {"status":"pending","chunks":0,"error":None} for p in paths}
+        self.created_at=datetime.utcnow().isoformat()
+        self.finished_at: Optional[str]=None
+
+    def to_dict(self)->Dict[str, Any]:
+        return {"job_id":self.job_id, "status":self.status, "collection":self.collection,
+                "files":{os.path.basename(p): dict(v) for p, v in self.files.items()},
+                "processed_files":{p: v["chunks"] for p, v in self.files.items() if v["status"] in DONE},
+                "total_chunks":sum(v["chunks"] for v in self.files.values()),
+                "created_at":self.created_at, "finished_at":self.finished_at}
+
+class IngestQueue:
+    """
+    Runs PDF/TXT extraction on a process pool; workers spool chunks to disk and an indexing thread in
+    this process streams them into the index (never the pool's own result-handling thread, which would
+    stall handing out work while a file is indexed and embedded). A pool whose workers died, e.g. to the
+    OOM killer, is replaced on the next submission.
+    """
+    def __init__(self, rag: CollectionManager, max_workers: Optional[int]=None, keep_jobs: int=500):
+        self.rag=rag
+        self.max_workers=max_workers or int(os.getenv("INGEST_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+        self.keep_jobs=keep_jobs
+        self.jobs: "OrderedDict[str, IngestJob]"=OrderedDict()
+        self._pool: Optional[ProcessPoolExecutor]=None
+        self._indexer=ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-index")
+        self._lock=threading.Lock()
+
+    def _get_pool(self)->ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool=ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+                logger.info(f"Ingestion pool started with {self.max_workers} workers")
+            return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor):
+        with self._lock:
+            if self._pool is not pool: return
+            self._pool=None
+        logger.warning("Ingestion pool broken (a worker died); starting a new one for the next upload")
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _extract(self, job: IngestJob, path: str, spool: str):
+        pool=self._get_pool()
+        try: fut=pool.submit(spool_chunks, path, spool)
+        except BrokenProcessPool:
+            self._reset_pool(pool); fut=self._get_pool().submit(spool_chunks, path, spool)
+        fut.add_done_callback(lambda fut: self._indexer.submit(self._done, job, path, spool, fut))
+
+    def submit(self, paths: List[str], collection: str=DEFAULT_COLLECTION, hashes: Optional[Dict[str,str]]=None)->IngestJob:
+        """Queue `paths` for indexing; files whose content hash matches the manifest are marked unchanged and skipped."""
+        job=IngestJob(paths, collection, hashes)
+        with self._lock:
+            self.jobs[job.job_id]=job
+            while len(self.jobs)>self.keep_jobs: self.jobs.popitem(last=False)
+        job.status="running"
+        for p in paths:
+            h=job.hashes.get(p)
+            if h and self.rag.unchanged(p, h, collection):
+                job.files[p]["status"]="unchanged"; ingest_files.inc(status="unchanged"); continue
+            job.files[p]["status"]="extracting"
+            fd, spool=tempfile.mkstemp(prefix="chunks-", suffix=".jsonl"); os.close(fd)
+            try: self._extract(job, p, spool)
+            except Exception as e:
+                logger.error(f"Ingest error {p}: {e}")
+                job.files[p].update(status="failed", error=str(e)); ingest_files.inc(status="failed")
+                try: os.remove(spool)
+                except OSError: pass
+        with self._lock:
+            if job.status=="running" and all(v["status"] in DONE for v in job.files.values()): self._finish(job)
+        return job
+
+    def _done(self, job: IngestJob, path: str, spool: str, fut: Future):
+        st=job.files[path]
+        try:
+            _, timings=fut.result()
+            st["status"]="indexing"
+            t0=time.perf_counter()
+            st["chunks"]=self.rag.add_chunks(path, read_spool(spool), collection=job.collection, content_hash=job.hashes.get(path))
+            timings["persist"]=time.perf_counter()-t0
+            t0=time.perf_counter()
+            try:
+                if index_vectors(path, job.collection): timings["embed"]=time.perf_counter()-t0
+            except Exception as e:
+                logger.error(f"Vector indexing error {path}: {e}"); st["vector_error"]=str(e)
+            st["status"]="indexed"; st["timings"]={k: round(v, 4) for k, v in timings.items()}
+            for stage, secs in timings.items(): ingest_stage.observe(secs, stage=stage)
+            ingest_files.inc(status="indexed"); ingest_chunks.inc(st["chunks"])
+        except Exception as e:
+            logger.error(f"Ingest error {path}: {e}")
+            st["status"]="failed"; st["error"]=str(e)
+            ingest_files.inc(status="failed")
+        finally:
+            try: os.remove(spool)
+            except OSError: pass
+        with self._lock:
+            if job.status=="running" and all(v["status"] in DONE for v in job.files.values()): self._finish(job)
+
+    def _finish(self, job: IngestJob):
+        job.status="failed" if job.files and all(v["status"]=="failed" for v in job.files.values()) else "completed"
+        job.finished_at=datetime.utcnow().isoformat()
+        logger.info(f"Ingest job {job.job_id} {job.status}")
+
+    def get(self, job_id: str)->Optional[IngestJob]: return self.jobs.get(job_id)
+
+    def shutdown(self):
+        if self._pool: self._pool.shutdown(wait=False, cancel_futures=True); self._pool=None
+        self._indexer.shutdown(wait=False, cancel_futures=True)
+
+ingest_queue=IngestQueue(rag_service)
@@ -0,0 +1,79 @@
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from itertools import islice
+from datetime import datetime
+import io, os, csv, json, uuid, logging
+from app.models.flow import FlowData, FlowStep
+from app.utils.validation import ValidationUtils, sanitize_input
+
+logger=logging.getLogger(__name__)
+
+FIELDS=("name","email","phone","service")
+ALIASES={"full_name":"name","fullname":"name","e-mail":"email","mail":"email","mobile":"phone","phone_number":"phone","contact":"phone"}
+
+def _rows(fh: BinaryIO, fmt: str)->Iterator[Tuple[int, Optional[Dict[str,Any]], Optional[str]]]:
+    """Yield (row number, record, parse error) one row at a time from a binary CSV/JSONL stream."""
+    text=io.TextIOWrapper(fh, encoding="utf-8-sig", errors="replace", newline="")
+    if fmt=="csv":
+        reader=csv.DictReader(text)
+        for n, row in enumerate(reader, start=2): yield n, row, None
+    else:
+        for n, line in enumerate(text, start=1):
+            if not line.strip(): continue
+            try:
+                rec=json.loads(line)
+                yield (n, rec, None) if isinstance(rec, dict) else (n, None, "Row is not a JSON object")
+            except ValueError as e:
+                yield n, None, f"Invalid JSON: {e}"
+
+def _normalize_keys(row: Dict[str,Any])->Dict[str,str]:
+    out={}
+    for k, v in row.items():
+        if k is None: continue
+        k=k.strip().lower().replace(" ", "_"); k=ALIASES.get(k, k)
+        if k in FIELDS: out[k]=sanitize_input(str(v)) if v is not None else ""
+    return out
+
+def validate_row(row: Dict[str,Any], options: List[str])->Tuple[Optional[Dict[str,Any]], List[str]]:
+    """Run the same validators as the chat flow; returns (normalized record, errors)."""
+    r=_normalize_keys(row); errors=[]
+    name=ValidationUtils.validate_name(r.get("name", ""))
+    email=ValidationUtils.validate_email(r.get("email", ""))
+    phone=ValidationUtils.validate_phone(r.get("phone", ""))
+    service=ValidationUtils.validate_service_selection(r.get("service", ""), options)
+    for field, v in (("name",name),("email",email),("phone",phone),("service",service)):
+        if not v['is_valid']: errors.append(f"{field}: {v['message']}")
+    if errors: return None, errors
+    fd=FlowData(step=FlowStep.END, name=name['normalized_name'], email=email['normalized_email'],
+                phone=phone['formatted_phone'], service=service['normalized_service'])
+    return fd.model_dump(exclude={"step"}), []
+
+def import_leads(fh: BinaryIO, fmt: str, options: List[str], out_dir: str="data/leads",
+                 batch_size: int=1000, max_errors: int=1000)->Dict[str,Any]:
+    """
+    Stream rows from `fh`, validate them in batches and append normalized records to a JSONL file.
+    Memory is bounded by one batch; per-row errors go to a sibling .errors.jsonl file and the
+    first `max_errors` are also returned.
+    """
+    fmt=fmt.lower()
+    if fmt not in ("csv","jsonl"): raise ValueError(f"Unsupported format {fmt!r}; use csv or jsonl")
+    os.makedirs(out_dir, exist_ok=True)
+    import_id=datetime.utcnow().strftime("%Y%m%d%H%M%S")+"-"+uuid.uuid4().hex[:8]
+    out_path=os.path.join(out_dir, f"import-{import_id}.jsonl")
+    err_path=os.path.join(out_dir, f"import-{import_id}.errors.jsonl")
+    total=valid=invalid=0; errors: List[Dict[str,Any]]=[]
+    rows=_rows(fh, fmt)
+    with open(out_path, "w", encoding="utf-8") as out, open(err_path, "w", encoding="utf-8") as err:
+        while batch:=list(islice(rows, batch_size)):
+            good=[]; bad=[]
+            for n, row, parse_err in batch:
+                rec, errs=(None, [parse_err]) if parse_err else validate_row(row, options)
+                if rec: good.append(json.dumps(rec, ensure_ascii=False))
+                else: bad.append({"row":n, "errors":errs})
+            if good: out.write("\n".join(good)+"\n")
+            if bad:
+                err.write("".join(json.dumps(b, ensure_ascii=False)+"\n" for b in bad))
+                errors.extend(bad[:max(0, max_errors-len(errors))])
+            total+=len(batch); valid+=len(good); invalid+=len(bad)
+    logger.info(f"Lead import {import_id}: {valid}/{total} valid")
+    return {"import_id":import_id, "total_rows":total, "valid":valid, "invalid":invalid,
+            "output":out_path, "errors_file":err_path, "errors":errors, "errors_truncated":invalid>len(errors)}
@@ -0,0 +1,97 @@
+from typing import Any, Dict, Iterator, List, Optional
+import os, json, time, queue, atexit, sqlite3, logging, threading
+from app.utils.metrics import lead_sink_dropped
+
+logger=logging.getLogger(__name__)
+
+class LeadSink:
+    """
+    Write-behind store for completed flow summaries.
+
+    submit() only enqueues; a background thread inserts batches into SQLite once
+    `batch_size` leads are pending or `flush_interval` seconds have passed. A batch that
+    fails to insert (e.g. "database is locked") is kept, with later leads joining it, and
+    retried after `retry_backoff` seconds, doubling each time; it is dropped only after
+    `retries` failed retries.
+    """
+    def __init__(self, path: str="data/leads.db", batch_size: int=200, flush_interval: float=1.0, retries: int=3, retry_backoff: float=0.5):
+        self.path=path; self.batch_size=batch_size; self.flush_interval=flush_interval
+        self.retries=retries; self.retry_backoff=retry_backoff
+        self._q: "queue.SimpleQueue[Optional[Dict[str,Any]]]"=queue.SimpleQueue()
+        self._thread: Optional[threading.Thread]=None
+        self._lock=threading.Lock()
+        self.written=0; self.failed=0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS leads (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, name TEXT, email TEXT, "
+                         "phone TEXT, service TEXT, completed_at TEXT, data TEXT NOT NULL)")
+
+    def _connect(self)->sqlite3.Connection:
+        conn=sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread=threading.Thread(target=self._run, name="lead-sink", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def submit(self, summary: Dict[str,Any]):
+        if self._thread is None: self._start()
+        self._q.put(dict(summary))
+
+    def _run(self):
+        conn=self._connect(); batch: List[Dict[str,Any]]=[]; deadline=None; stop=False; attempts=0
+        while not stop or batch:
+            timeout=None if deadline is None else max(0.0, deadline-time.monotonic())
+            try:
+                item=self._q.get(timeout=timeout)
+                if item is None: stop=True
+                else:
+                    batch.append(item)
+                    if deadline is None: deadline=time.monotonic()+self.flush_interval
+            except queue.Empty:
+                pass
+            # while a failed batch backs off, only its retry deadline triggers the next attempt
+            if batch and (time.monotonic()>=deadline or (not attempts and (stop or len(batch)>=self.batch_size))):
+                if self._write(conn, batch): batch=[]; deadline=None; attempts=0
+                elif attempts<self.retries:
+                    deadline=time.monotonic()+self.retry_backoff*2**attempts; attempts+=1
+                else:
+                    self.failed+=len(batch); lead_sink_dropped.inc(len(batch))
+                    logger.error(f"Lead sink dropped {len(batch)} leads after {attempts+1} failed writes")
+                    batch=[]; deadline=None; attempts=0
+        conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: List[Dict[str,Any]])->bool:
+        rows=[(s.get("session_id"), s.get("name"), s.get("email"), s.get("phone"), s.get("service"), s.get("completed_at"),
+               json.dumps(s, ensure_ascii=False, default=str)) for s in batch]
+        try:
+            with conn:
+                conn.executemany("INSERT INTO leads (session_id, name, email, phone, service, completed_at, data) VALUES (?,?,?,?,?,?,?)", rows)
+            self.written+=len(rows)
+            return True
+        except Exception as e:
+            logger.warning(f"Lead sink write error ({len(rows)} leads kept for retry): {e}")
+            return False
+
+    def close(self):
+        if self._thread is None or not self._thread.is_alive(): return
+        self._q.put(None); self._thread.join(timeout=5)
+
+    def export(self, after_id: int=0, limit: int=1000)->Iterator[Dict[str,Any]]:
+        """Yield stored leads with id > after_id in id order (keyset pagination)."""
+        conn=self._connect()
+        try:
+            for lead_id, data in conn.execute("SELECT id, data FROM leads WHERE id>? ORDER BY id LIMIT ?", (after_id, limit)):
+                yield {"id":lead_id, **json.loads(data)}
+        finally:
+            conn.close()
+
+    def stats(self)->Dict[str,Any]:
+        return {"pending":self._q.qsize(), "written":self.written, "failed":self.failed}
+
+lead_sink=LeadSink(os.getenv("LEAD_DB", "data/leads.db"), batch_size=int(os.getenv("LEAD_BATCH", "200")),
+                   flush_interval=float(os.getenv("LEAD_FLUSH_S", "1.0")), retries=int(os.getenv("LEAD_RETRIES", "3")))
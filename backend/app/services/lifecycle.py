@@ -0,0 +1,61 @@
+from typing import Any, Dict, Optional
+import time, logging, threading
+from app.services.rag_service import rag_service
+from app.services.ingest_jobs import ingest_queue
+from app.services.lead_sink import lead_sink
+from app.services.flow_service import flow_service
+from app.services.retrieval import VECTOR_STORE_ENABLED, vector_store_for, close_vector_stores
+
+logger=logging.getLogger(__name__)
+
+# Startup/shutdown work driven by the FastAPI lifespan in app.main. Nothing heavy runs at import
+# time: the app answers /health immediately and /ready turns green once warm_up() has finished.
+
+class Readiness:
+    def __init__(self):
+        self.ready=False; self.error: Optional[str]=None
+        self.started=time.monotonic()
+        self.components: Dict[str, Dict[str, Any]]={}
+        self._lock=threading.Lock()
+
+    def mark(self, name: str, status: str, seconds: float, error: Optional[str]=None):
+        with self._lock: self.components[name]={"status":status, "seconds":round(seconds, 3), **({"error":error} if error else {})}
+
+    def to_dict(self)->Dict[str, Any]:
+        with self._lock:
+            return {"status":"ready" if self.ready else ("failed" if self.error else "starting"),
+                    "uptime_s":round(time.monotonic()-self.started, 3), "components":dict(self.components),
+                    **({"error":self.error} if self.error else {})}
+
+readiness=Readiness()
+
+def _warm(name: str, fn, required: bool=True)->bool:
+    t0=time.perf_counter()
+    try:
+        fn(); readiness.mark(name, "ok", time.perf_counter()-t0)
+        logger.info(f"Warm-up {name} done in {time.perf_counter()-t0:.2f}s")
+        return True
+    except Exception as e:
+        readiness.mark(name, "failed", time.perf_counter()-t0, str(e))
+        logger.error(f"Warm-up {name} failed: {e}")
+        return not required
+
+def warm_up():
+    """Load indexes and run dummy queries; runs in a background thread after the server starts."""
+    ok=_warm("keyword_index", rag_service.warm_up)
+    if VECTOR_STORE_ENABLED:
+        def vectors():
+            store=vector_store_for()
+            if store is None: raise RuntimeError("vector store dependencies are not installed")
+            store.warm_up()
+        ok=_warm("vector_store", vectors, required=False) and ok
+    if ok: readiness.ready=True
+    else: readiness.error="warm-up failed"
+
+def shutdown():
+    """Stop background workers and flush buffered writes before the process exits."""
+    for name, fn in (("ingest pool", ingest_queue.shutdown), ("lead sink", lead_sink.close),
+                     ("session store", flow_service.store.close), ("keyword index", rag_service.close),
+                     ("vector stores", close_vector_stores)):
+        try: fn()
+        except Exception as e: logger.error(f"Shutdown {name} failed: {e}")
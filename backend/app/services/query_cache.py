@@ -0,0 +1,72 @@
+from typing import Any, Dict, Hashable, Optional, Tuple
+from collections import OrderedDict
+import os, re, json, time, threading
+from app.utils.metrics import registry
+
+WORD_RE=re.compile(r"\w+", re.UNICODE)
+
+def normalize_query(q: str)->str:
+    return " ".join(WORD_RE.findall((q or "").lower()))
+
+def _sizeof(value: Any)->int:
+    if isinstance(value, str): return len(value.encode("utf-8"))
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+
+class QueryCache:
+    """
+    LRU + TTL cache for retrieval results, bounded by entry count and approximate bytes.
+
+    Keys include the index generation, so bumping the generation on ingest invalidates
+    everything cached for that index without an explicit flush.
+    """
+    def __init__(self, max_entries: int=1024, max_bytes: int=8*1024*1024, ttl: float=300.0):
+        self.max_entries=max_entries; self.max_bytes=max_bytes; self.ttl=ttl
+        self._data: "OrderedDict[Hashable, Tuple[float,int,Any]]"=OrderedDict()   # key -> (expires, size, value)
+        self._bytes=0
+        self._lock=threading.Lock()
+        self.hits=0; self.misses=0; self.evictions=0
+
+    @staticmethod
+    def key(namespace: str, generation: int, q: str, k: int)->Tuple[str,int,str,int]:
+        return (namespace, generation, normalize_query(q), k)
+
+    def get(self, key: Hashable)->Optional[Any]:
+        with self._lock:
+            hit=self._data.get(key)
+            if hit is None or hit[0]<time.monotonic():
+                if hit is not None: self._drop(key)
+                self.misses+=1; return None
+            self._data.move_to_end(key); self.hits+=1
+            return hit[2]
+
+    def put(self, key: Hashable, value: Any):
+        size=_sizeof(value)
+        if size>self.max_bytes: return
+        with self._lock:
+            if key in self._data: self._drop(key)
+            self._data[key]=(time.monotonic()+self.ttl, size, value); self._bytes+=size
+            while len(self._data)>self.max_entries or self._bytes>self.max_bytes:
+                self._drop(next(iter(self._data))); self.evictions+=1
+
+    def _drop(self, key: Hashable):
+        _, size, _=self._data.pop(key); self._bytes-=size
+
+    def clear(self):
+        with self._lock: self._data.clear(); self._bytes=0
+
+    def stats(self)->Dict[str, Any]:
+        with self._lock:
+            total=self.hits+self.misses
+            return {"entries":len(self._data), "bytes":self._bytes, "max_entries":self.max_entries, "max_bytes":self.max_bytes,
+                    "ttl_seconds":self.ttl, "hits":self.hits, "misses":self.misses, "evictions":self.evictions,
+                    "hit_ratio":round(self.hits/total, 4) if total else 0.0}
+
+query_cache=QueryCache(
+    max_entries=int(os.getenv("QUERY_CACHE_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("QUERY_CACHE_MB", "8"))*1024*1024,
+    ttl=float(os.getenv("QUERY_CACHE_TTL", "300")),
+)
+
+registry.gauge("query_cache_entries", "Entries held by the query cache", fn=lambda: len(query_cache._data))
+registry.gauge("query_cache_bytes", "Approximate bytes held by the query cache", fn=lambda: query_cache._bytes)
+registry.gauge("query_cache_evictions", "Query cache evictions since start", fn=lambda: query_cache.evictions)
@@ -1,70 +1,404 @@
-from typing import List, Dict
-import os, pickle, logging
+from typing import Any, List, Dict, Tuple, Iterable, Iterator, Optional
+import os, re, json, math, time, uuid, heapq, pickle, logging, threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from itertools import islice, count
 from datetime import datetime
+from app.services.segment_store import SegmentStore, PUT, DEL
+from app.utils.metrics import rag_query
 
 logger=logging.getLogger(__name__)
 
+TOKEN_RE=re.compile(r"\w+", re.UNICODE)
+COLLECTION_RE=re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+DEFAULT_COLLECTION="default"
+MANIFEST_PREFIX="\x00doc::"   # manifest records share the segment store with chunks so replacements commit in one frame
+HASHED_RE=re.compile(r"^.*@[0-9a-f]{16}$")
+_generations=count(1)   # process-wide, so a collection reopened after eviction never reuses cached generations
+FOLLOW_INTERVAL_S=float(os.getenv("RAG_FOLLOW_INTERVAL_S", "1"))   # how often a read-only worker looks for the writer's new frames
+
+def tokenize(text: str)->List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+def _split_key(key: str)->Tuple[str,int]:
+    prefix, _, i=key.rpartition("::chunk_")
+    return (prefix, int(i)) if prefix and i.isdigit() else (key, 0)
+
+def doc_name(key: str)->str:
+    prefix=_split_key(key)[0]
+    return prefix.rpartition("@")[0] if HASHED_RE.match(prefix) else prefix
+
+def best_window(text: str, q_tokens: Iterable[str], size: int=40)->str:
+    """The `size`-word window of `text` containing the most query-token occurrences."""
+    words=text.split()
+    if len(words)<=size: return " ".join(words)
+    want=set(q_tokens)
+    hits=[1 if want.intersection(tokenize(w)) else 0 for w in words]
+    cur=best=sum(hits[:size]); start=0
+    for i in range(size, len(words)):
+        cur+=hits[i]-hits[i-size]
+        if cur>best: best=cur; start=i-size+1
+    return ("… " if start else "")+" ".join(words[start:start+size])+(" …" if start+size<len(words) else "")
+
+def _batched(items: Iterable[str], n: int)->Iterator[List[str]]:
+    it=iter(items)
+    while part:=list(islice(it, n)): yield part
+
+class InvertedIndex:
+    """BM25 inverted index: token -> {doc key: term frequency}, plus per-doc lengths."""
+    def __init__(self, k1: float=1.5, b: float=0.75):
+        self.k1=k1; self.b=b
+        self.postings: Dict[str, Dict[str,int]]={}
+        self.doc_len: Dict[str,int]={}
+        self.total_len=0
+
+    def __len__(self): return len(self.doc_len)
+
+    def add(self, key: str, text: str):
+        if key in self.doc_len: self.remove(key)
+        tf=Counter(tokenize(text))
+        for tok, n in tf.items(): self.postings.setdefault(tok, {})[key]=n
+        n=sum(tf.values()); self.doc_len[key]=n; self.total_len+=n
+
+    def remove(self, key: str, text: str=None):
+        n=self.doc_len.pop(key, None)
+        if n is None: return
+        self.total_len-=n
+        toks=set(tokenize(text)) if text is not None else [t for t, p in self.postings.items() if key in p]
+        for tok in toks:
+            p=self.postings.get(tok)
+            if p is None: continue
+            p.pop(key, None)
+            if not p: del self.postings[tok]
+
+    def search(self, q: str, k: int=3)->List[Tuple[float,str]]:
+        N=len(self.doc_len)
+        if not N: return []
+        avgdl=self.total_len/N or 1.0
+        k1=self.k1; b=self.b
+        scores: Dict[str,float]={}
+        for tok, qtf in Counter(tokenize(q)).items():
+            p=self.postings.get(tok)
+            if not p: continue
+            idf=math.log(1+(N-len(p)+0.5)/(len(p)+0.5))
+            for key, tf in p.items():
+                dl=self.doc_len[key]
+                scores[key]=scores.get(key, 0.0)+qtf*idf*tf*(k1+1)/(tf+k1*(1-b+b*dl/avgdl))
+        return heapq.nlargest(k, ((s, key) for key, s in scores.items()))
+
 class SimpleRAGService:
-    def __init__(self):
-        self.docs: Dict[str, str]={}
-        self.persist="vector_db/simple.pkl"
-        self._load()
+    """
+    Keyword (BM25) retrieval over one collection's persisted chunks. The store and index are loaded on first use or by warm_up().
+
+    The first process to open a collection's store is its writer; other worker processes open it read-only,
+    serve queries from their own index and apply the writer's changes at most every FOLLOW_INTERVAL_S.
+    """
+    def __init__(self, name: str=DEFAULT_COLLECTION, persist: str="vector_db/simple", legacy: Optional[str]="vector_db/simple.pkl"):
+        self.name=name
+        self.persist=persist
+        self.legacy=legacy
+        self.index=InvertedIndex()
+        self.docs: Optional[SegmentStore]=None
+        self.manifest: Dict[str, Dict[str, Any]]={}   # document name -> hash, key prefix, chunk range
+        self._lock=threading.RLock()
+        self.generation=next(_generations)
+        self.loaded=False
+        self.last_used=time.monotonic(); self.users=0
+        self._followed=0.0
+
+    def load(self):
+        if self.loaded:
+            docs=self.docs
+            if docs is not None and docs.readonly and time.monotonic()-self._followed>=FOLLOW_INTERVAL_S: self._follow()
+            return
+        with self._lock:
+            if not self.loaded: self._load(); self.loaded=True
+
+    @property
+    def writer(self)->Optional[str]:
+        """pid of the process that writes this collection's store, or None when it is this one."""
+        docs=self.docs
+        return docs.owner if docs is not None and docs.readonly else None
+
+    def warm_up(self):
+        """Load the store and run one throwaway search so the first real query pays no setup cost."""
+        self.load()
+        with self._lock: self.index.search("warm up", 1)
+
+    def close(self):
+        """Release the segment store and the in-memory index; a later call loads them again."""
+        with self._lock:
+            if self.docs is not None: self.docs.close()
+            self.docs=None; self.index=InvertedIndex(); self.manifest={}; self.loaded=False
 
     def _load(self):
+        self.docs=SegmentStore(self.persist, shared=True)
+        self._followed=time.monotonic()
         try:
-            if os.path.exists(self.persist):
-                with open(self.persist,'rb') as f: self.docs=pickle.load(f)
-                logger.info(f"Loaded {len(self.docs)} chunks")
+            if not self.docs.readonly and self.legacy and os.path.exists(self.legacy):
+                if self.docs.written: logger.info(f"Not migrating {self.legacy}: {self.persist} already has data")
+                else:
+                    with open(self.legacy,'rb') as f: self.docs.put_many(pickle.load(f).items())
+                    logger.info(f"Migrated {len(self.docs)} chunks from {self.legacy}")
+                os.replace(self.legacy, self.legacy+".migrated")   # imported once, so deleted documents stay deleted
         except Exception as e:
-            logger.error(f"Load error: {e}"); self.docs={}
+            logger.error(f"Load error: {e}")
+        self._build()
 
-    def _save(self):
-        try:
-            os.makedirs(os.path.dirname(self.persist), exist_ok=True)
-            with open(self.persist,'wb') as f: pickle.dump(self.docs, f)
-        except Exception as e:
-            logger.error(f"Save error: {e}")
-
-    def add_documents(self, paths: List[str])->Dict[str,int]:
-        import re
-        out={}
-        for p in paths:
-            try:
-                text=""
-                if p.lower().endswith(".txt"):
-                    with open(p, 'r', encoding='utf-8') as f: text=f.read()
-                elif p.lower().endswith(".pdf"):
-                    try:
-                        import PyPDF2
-                        with open(p, 'rb') as f:
-                            reader=PyPDF2.PdfReader(f)
-                            for pg in reader.pages: text += (pg.extract_text() or "") + "\n"
-                    except Exception:
-                        text=f"PDF {os.path.basename(p)} (install PyPDF2 for full extraction)"
-                text=re.sub(r'\s+', ' ', text).strip()
-                chunks=[text[i:i+900] for i in range(0, len(text), 900)] if text else []
-                base=os.path.basename(p)
-                for i,c in enumerate(chunks):
-                    self.docs[f"{base}::chunk_{i}"]=c
-                out[p]=len(chunks)
-                logger.info(f"Indexed {len(chunks)} chunks from {base}")
+    def _build(self):
+        """Rebuild the manifest and index from the store; the writer also drops uncommitted chunks and lists pre-manifest documents."""
+        self.manifest={k[len(MANIFEST_PREFIX):]: json.loads(self.docs[k]) for k in self.docs if k.startswith(MANIFEST_PREFIX)}
+        prefixes={m["prefix"] for m in self.manifest.values()}
+        self.index=InvertedIndex(); orphans=[]; unlisted: Dict[str,List[int]]={}
+        for k in self.docs:
+            if k.startswith(MANIFEST_PREFIX): continue
+            prefix, i=_split_key(k)
+            if prefix not in prefixes:
+                # chunks written by an upload that never committed, or pre-manifest chunks
+                if HASHED_RE.match(prefix): orphans.append(k); continue
+                unlisted.setdefault(prefix, []).append(i)
+            self.index.add(k, self.docs[k])
+        for name, idx in unlisted.items(): self.manifest[name]={"hash":None, "prefix":name, "chunks":len(idx), "range":[0, max(idx)+1], "indexed_at":None}
+        if self.docs.readonly:
+            logger.info(f"Loaded {len(self.index)} chunks from {len(self.manifest)} documents into collection {self.name} (read-only, writer pid {self.docs.owner})")
+            return
+        if orphans:
+            self.docs.delete_many(orphans); logger.info(f"Dropped {len(orphans)} uncommitted chunks from collection {self.name}")
+        if unlisted:
+            self.docs.put_many((MANIFEST_PREFIX+name, json.dumps(self.manifest[name])) for name in unlisted)
+            logger.info(f"Added manifest entries for {len(unlisted)} existing documents in collection {self.name}")
+        logger.info(f"Loaded {len(self.index)} chunks from {len(self.manifest)} documents into collection {self.name}")
+
+    def _follow(self):
+        """Bring a read-only copy up to date with the frames the writer process appended since the last look."""
+        with self._lock:
+            if self.docs is None or not self.docs.readonly or time.monotonic()-self._followed<FOLLOW_INTERVAL_S: return
+            self._followed=time.monotonic()
+            try: changed=self.docs.refresh()
             except Exception as e:
-                logger.error(f"Doc error {p}: {e}"); out[p]=0
-        if out: self._save()
-        return out
-
-    def query(self, q: str)->str:
-        if not self.docs: return "No documents indexed yet. Upload PDF or TXT files first."
-        ql=q.lower().split()
-        scored=[]
-        for k, c in self.docs.items():
-            cl=c.lower()
-            score=sum(cl.count(w) for w in ql)
-            if q.lower() in cl: score+=5
-            if score>0: scored.append((score, c, k))
-        if not scored: return f"No relevant information found for '{q}'. Try rephrasing."
-        scored.sort(key=lambda x: x[0], reverse=True)
-        best=" ".join(" ".join(s.split()[:40]) for _, s, _ in scored[:3])
-        return best
-
-rag_service=SimpleRAGService()
+                logger.error(f"Refresh error in collection {self.name}: {e}"); return
+            if changed is None: self._build()
+            elif changed: self._apply(changed)
+            else: return
+            self.generation=next(_generations)
+
+    def _apply(self, changed: Dict[str, Optional[str]]):
+        """Update the index and manifest for keys the writer changed; `changed` maps each key to its previous text."""
+        for k, old in changed.items():
+            if old is not None and k in self.index.doc_len: self.index.remove(k, old)
+        for k in changed:
+            if not k.startswith(MANIFEST_PREFIX): continue
+            name=k[len(MANIFEST_PREFIX):]
+            if k in self.docs: self.manifest[name]=json.loads(self.docs[k])
+            else: self.manifest.pop(name, None)
+        prefixes={m["prefix"] for m in self.manifest.values()}
+        added={k for k in changed if not k.startswith(MANIFEST_PREFIX) and _split_key(k)[0] in prefixes}
+        for k in changed:   # a committed manifest entry makes its chunks, written in earlier frames, visible
+            if k.startswith(MANIFEST_PREFIX) and k in self.docs: added.update(self._doc_keys(json.loads(self.docs[k])))
+        for k in added:
+            if k in self.docs and k not in self.index.doc_len: self.index.add(k, self.docs[k])
+
+    def _doc_keys(self, entry: Dict[str, Any])->List[str]:
+        lo, hi=entry["range"]
+        return [k for k in (f"{entry['prefix']}::chunk_{i}" for i in range(lo, hi)) if k in self.docs]
+
+    def _commit(self, ops: List[Tuple[int,str,Optional[str]]], drop: List[str]):
+        """Write `ops` plus deletes of `drop` as one frame and unindex the dropped chunks (caller holds the lock)."""
+        for k in drop: self.index.remove(k, self.docs[k])   # needs the text, so before the delete is applied
+        try: self.docs.append([*ops, *((DEL, k, None) for k in drop)])
+        except Exception:
+            for k in drop: self.index.add(k, self.docs[k])
+            raise
+
+    def unchanged(self, name: str, content_hash: str)->bool:
+        self.load()
+        entry=self.manifest.get(os.path.basename(name))
+        return entry is not None and entry["hash"]==content_hash
+
+    def add_chunks(self, path: str, chunks: Iterable[str], batch: int=256, content_hash: Optional[str]=None)->int:
+        """
+        Index a stream of chunks for `path`, replacing any previous version atomically.
+
+        New chunks are persisted one segment frame per `batch` under keys namespaced by the
+        content hash, so they never overwrite the live version. A final frame records the
+        manifest entry and deletes the old chunks; only then does the in-memory index switch.
+        """
+        self.load(); base=os.path.basename(path); n=0
+        prefix=f"{base}@{(content_hash or uuid.uuid4().hex)[:16]}"
+        for part in _batched(chunks, batch):
+            self.docs.put_many((f"{prefix}::chunk_{n+i}", c) for i, c in enumerate(part))
+            n+=len(part)
+        entry={"hash":content_hash, "prefix":prefix, "chunks":n, "range":[0, n], "indexed_at":datetime.utcnow().isoformat()}
+        new_keys=[f"{prefix}::chunk_{i}" for i in range(n)]; fresh=set(new_keys)
+        with self._lock:
+            old=self.manifest.get(base)
+            stale=[k for k in self._doc_keys(old) if k not in fresh] if old else []
+            self._commit([(PUT, MANIFEST_PREFIX+base, json.dumps(entry))], stale)
+            for k in new_keys: self.index.add(k, self.docs[k])
+            self.manifest[base]=entry
+            self.generation=next(_generations)
+        logger.info(f"Indexed {n} chunks from {base}" + (f", replaced {len(stale)}" if old else ""))
+        return n
+
+    def delete_document(self, name: str)->Optional[int]:
+        """Remove a document and all of its chunks in one frame; returns the chunk count or None if unknown."""
+        self.load()
+        with self._lock:
+            entry=self.manifest.get(name)
+            if entry is None: return None
+            keys=self._doc_keys(entry)
+            self._commit([(DEL, MANIFEST_PREFIX+name, None)], keys)
+            del self.manifest[name]
+            self.generation=next(_generations)
+        logger.info(f"Deleted {name} ({len(keys)} chunks) from collection {self.name}")
+        return len(keys)
+
+    def documents(self)->List[Dict[str, Any]]:
+        self.load()
+        with self._lock:
+            return [{"name":name, "hash":m["hash"], "chunks":m["chunks"], "indexed_at":m["indexed_at"]} for name, m in sorted(self.manifest.items())]
+
+    def search(self, q: str, k: int=3)->List[Dict[str, Any]]:
+        """Top-k BM25 hits with their document, chunk number, score and best-matching passage window."""
+        self.load(); q_tokens=tokenize(q)
+        with self._lock, rag_query.time():
+            top=self.index.search(q, k)
+            texts=[self.docs[key] for _, key in top]
+        return [{"key":key, "document":doc_name(key), "chunk":_split_key(key)[1], "score":round(score, 4),
+                 "passage":best_window(text, q_tokens)} for (score, key), text in zip(top, texts)]
+
+    def texts(self, keys: Iterable[str])->Dict[str, str]:
+        """Current text of each key that is still live (keys of replaced or deleted versions are left out)."""
+        self.load()
+        with self._lock: return {k: self.docs[k] for k in keys if k in self.docs and not k.startswith(MANIFEST_PREFIX)}
+
+def validate_collection(name: Optional[str])->str:
+    name=name or DEFAULT_COLLECTION
+    if not COLLECTION_RE.match(name): raise ValueError(f"Invalid collection {name!r}: use 1-64 letters, digits, '-' or '_'")
+    return name
+
+class CollectionManager:
+    """
+    One SimpleRAGService (index partition + segment store) per collection.
+
+    Collections are opened on first use; ones idle for `idle_s` seconds, or the least recently
+    used beyond `max_active`, are closed so memory follows the active set. A collection is never
+    evicted while a call is using it, and a call for a collection that is being closed waits until
+    its store is released before opening it again. The default collection keeps the original vector_db/simple
+    location; others live under `root/<name>`.
+    """
+    def __init__(self, root: str="vector_db/collections", idle_s: float=900.0, max_active: int=64, sweep_interval: float=30.0):
+        self.root=root; self.idle_s=idle_s; self.max_active=max_active; self.sweep_interval=sweep_interval
+        self.active: "OrderedDict[str, SimpleRAGService]"=OrderedDict()
+        self.evicted=0
+        self.closing: Dict[str, threading.Event]={}   # collections evicted from `active` whose store is still being closed
+        self._lock=threading.Lock()
+        self._last_sweep=time.monotonic()
+
+    def _create(self, name: str)->SimpleRAGService:
+        if name==DEFAULT_COLLECTION: return SimpleRAGService()
+        return SimpleRAGService(name, os.path.join(self.root, name), legacy=None)
+
+    @contextmanager
+    def use(self, collection: Optional[str]=None)->Iterator[SimpleRAGService]:
+        """Pin a collection (creating the service if needed) for the duration of the block."""
+        name=validate_collection(collection)
+        while True:
+            with self._lock:
+                closing=self.closing.get(name)
+                if closing is None:
+                    svc=self.active.get(name)
+                    if svc is None: svc=self.active[name]=self._create(name)
+                    self.active.move_to_end(name); svc.users+=1; svc.last_used=time.monotonic()
+                    break
+            closing.wait()
+        try:
+            svc.load(); yield svc
+        finally:
+            with self._lock: svc.users-=1; svc.last_used=time.monotonic()
+            if time.monotonic()-self._last_sweep>=self.sweep_interval or len(self.active)>self.max_active: self.sweep()
+
+    def sweep(self):
+        now=time.monotonic(); drop=[]
+        with self._lock:
+            self._last_sweep=now
+            over=len(self.active)-self.max_active
+            for name, svc in list(self.active.items()):   # least recently used first
+                if name==DEFAULT_COLLECTION or svc.users: continue
+                if over>0 or now-svc.last_used>self.idle_s:
+                    drop.append(self.active.pop(name)); self.closing[name]=threading.Event(); over-=1
+            self.evicted+=len(drop)
+        self._close(drop)
+        if drop:
+            logger.info(f"Evicted idle collections: {', '.join(s.name for s in drop)}")
+
+    # ---- same API as SimpleRAGService, with an optional collection ----
+    def exists(self, collection: Optional[str])->bool:
+        name=validate_collection(collection)
+        return name==DEFAULT_COLLECTION or name in self.active or os.path.isdir(os.path.join(self.root, name))
+
+    def add_chunks(self, path: str, chunks: Iterable[str], batch: int=256, collection: Optional[str]=None, content_hash: Optional[str]=None)->int:
+        with self.use(collection) as svc: return svc.add_chunks(path, chunks, batch, content_hash)
+
+    def search(self, q: str, k: int=3, collection: Optional[str]=None)->List[Dict[str, Any]]:
+        if not self.exists(collection): return []
+        with self.use(collection) as svc: return svc.search(q, k)
+
+    def texts(self, keys: Iterable[str], collection: Optional[str]=None)->Dict[str, str]:
+        if not self.exists(collection): return {}
+        with self.use(collection) as svc: return svc.texts(keys)
+
+    def entry(self, name: str, collection: Optional[str]=None)->Optional[Dict[str, Any]]:
+        if not self.exists(collection): return None
+        with self.use(collection) as svc:
+            e=svc.manifest.get(name)
+            return dict(e) if e else None
+
+    def writer(self, collection: Optional[str]=None)->Optional[str]:
+        if not self.exists(collection): return None
+        with self.use(collection) as svc: return svc.writer
+
+    def generation(self, collection: Optional[str]=None)->int:
+        with self.use(collection) as svc: return svc.generation
+
+    def unchanged(self, name: str, content_hash: str, collection: Optional[str]=None)->bool:
+        if not self.exists(collection): return False
+        with self.use(collection) as svc: return svc.unchanged(name, content_hash)
+
+    def delete_document(self, name: str, collection: Optional[str]=None)->Optional[int]:
+        if not self.exists(collection): return None
+        with self.use(collection) as svc: return svc.delete_document(name)
+
+    def documents(self, collection: Optional[str]=None)->List[Dict[str, Any]]:
+        if not self.exists(collection): return []
+        with self.use(collection) as svc: return svc.documents()
+
+    def warm_up(self):
+        with self.use(DEFAULT_COLLECTION) as svc: svc.warm_up()
+
+    def _close(self, services: List[SimpleRAGService]):
+        """Close services already moved from `active` to `closing`, then let waiting callers reopen them."""
+        for svc in services:
+            try: svc.close()
+            except Exception as e: logger.error(f"Close error in collection {svc.name}: {e}")
+            finally:
+                with self._lock: self.closing.pop(svc.name).set()
+
+    def close(self):
+        with self._lock:
+            services=list(self.active.values()); self.active.clear()
+            for svc in services: self.closing[svc.name]=threading.Event()
+        self._close(services)
+
+    def collections(self)->List[str]:
+        names={DEFAULT_COLLECTION}
+        if os.path.isdir(self.root): names.update(n for n in os.listdir(self.root) if COLLECTION_RE.match(n))
+        return sorted(names)
+
+    def stats(self)->Dict[str, Any]:
+        with self._lock: active=list(self.active.values())
+        return {"active":{s.name: {"documents":len(s.manifest), "chunks":len(s.index), "generation":s.generation, "idle_s":round(time.monotonic()-s.last_used, 1)} for s in active},
+                "evicted":self.evicted, "idle_s":self.idle_s, "max_active":self.max_active}
+
+rag_service=CollectionManager(idle_s=float(os.getenv("RAG_COLLECTION_IDLE_S", "900")),
+                              max_active=int(os.getenv("RAG_MAX_COLLECTIONS", "64")))
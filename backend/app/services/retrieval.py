@@ -0,0 +1,129 @@
+from typing import Any, Dict, List, Optional, Tuple
+import os, time, asyncio, logging
+from app.services.rag_service import rag_service, tokenize, best_window, doc_name, validate_collection, DEFAULT_COLLECTION
+from app.services.query_cache import query_cache
+from app.utils.admission import offload, to_cpu
+from app.utils.metrics import rag_retriever, rag_retriever_outcomes, rag_query_cache
+
+logger=logging.getLogger(__name__)
+
+# Keyword (BM25) retrieval always runs; "hybrid" also queries the collection's FAISS store and merges
+# both rankings with reciprocal-rank fusion. Once one retriever has answered, the others get what is left
+# of the hybrid budget, so a slow embedding model degrades results instead of failing the request; a
+# lone retriever (keyword mode, or after the other failed) runs until the endpoint's own deadline.
+
+VECTOR_STORE_ENABLED=os.getenv("VECTOR_STORE_ENABLED", "0").lower() in ("1","true","yes")
+MODES=("keyword","hybrid")
+RETRIEVAL_MODE=os.getenv("RAG_RETRIEVAL", "hybrid" if VECTOR_STORE_ENABLED else "keyword")
+HYBRID_BUDGET_S=float(os.getenv("RAG_HYBRID_BUDGET_MS", "800"))/1000
+RRF_K=60
+_vector_unavailable=False
+
+def vector_store_for(collection: Optional[str]=None):
+    """The collection's VectorStore, or None when vectors are disabled or the FAISS/embedding stack is not installed."""
+    global _vector_unavailable
+    if not VECTOR_STORE_ENABLED or _vector_unavailable: return None
+    try:
+        from app.services.vector_store import get_vector_store
+    except ImportError as e:
+        logger.warning(f"Vector retrieval disabled, missing dependency: {e}"); _vector_unavailable=True
+        return None
+    name=validate_collection(collection)
+    return get_vector_store("vector_db/faiss_store" if name==DEFAULT_COLLECTION else os.path.join(rag_service.root, name, "faiss"))
+
+def close_vector_stores():
+    """Flush pending FAISS snapshots on shutdown (no-op unless vector stores were opened)."""
+    if not VECTOR_STORE_ENABLED or _vector_unavailable: return
+    from app.services.vector_store import close_vector_stores as close_all
+    close_all()
+
+def index_vectors(path: str, collection: Optional[str]=None)->int:
+    """Embed the committed chunks of `path` into the collection's vector store and drop the vectors of
+    its previous versions (no-op when disabled)."""
+    store=vector_store_for(collection)
+    if store is None: return 0
+    name=os.path.basename(path); entry=rag_service.entry(name, collection)
+    if entry is None: return 0
+    keys=[f"{entry['prefix']}::chunk_{i}" for i in range(*entry["range"])]
+    added=store.add_chunks(list(rag_service.texts(keys, collection).items()), name)
+    stale=store.delete_source(name, keep=keys)
+    if stale: logger.info(f"Removed {stale} stale vectors of {name} from collection {validate_collection(collection)}")
+    return added
+
+def drop_vectors(name: str, collection: Optional[str]=None)->int:
+    """Remove every vector of a deleted document from the collection's vector store."""
+    store=vector_store_for(collection)
+    return store.delete_source(name) if store is not None else 0
+
+def _timed(name: str, fn, *args):
+    t0=time.perf_counter()
+    try: return fn(*args)
+    finally: rag_retriever.observe(time.perf_counter()-t0, retriever=name)
+
+def rrf(rankings: Dict[str, List[str]], k: int=RRF_K)->List[Tuple[str, float]]:
+    """Reciprocal-rank fusion: each list contributes 1/(k+rank) to the keys it contains."""
+    scores: Dict[str, float]={}
+    for keys in rankings.values():
+        for rank, key in enumerate(keys):
+            scores[key]=scores.get(key, 0.0)+1.0/(k+rank+1)
+    return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+
+def _prepare(q: str, k: int, collection: str, mode: str)->Optional[Tuple[str, Any, str, Optional[Dict[str, Any]]]]:
+    """Effective mode, vector store, cache key and cached answer; None when the collection does not exist.
+    Runs on the CPU pool: resolving the generation loads a cold or evicted collection."""
+    if not rag_service.exists(collection): return None
+    store=vector_store_for(collection) if mode=="hybrid" else None
+    if store is None: mode="keyword"
+    cache_key=query_cache.key(f"{mode}:{collection}", (rag_service.generation(collection), store.generation if store else 0), q, k)
+    return mode, store, cache_key, query_cache.get(cache_key)
+
+def _fuse(q: str, k: int, collection: str, mode: str, results: Dict[str, list], status: Dict[str, str])->Dict[str, Any]:
+    lexical={h["key"]: h for h in results.get("bm25", [])}
+    vector_hits=[h for h in results.get("vector", []) if h["metadata"].get("key")]
+    texts=rag_service.texts([h["metadata"]["key"] for h in vector_hits if h["metadata"]["key"] not in lexical], collection)
+    vector={h["metadata"]["key"]: h for h in vector_hits if h["metadata"]["key"] in lexical or h["metadata"]["key"] in texts}   # drops replaced/deleted versions
+    fused=rrf({"bm25":list(lexical), "vector":list(vector)})[:k]
+    q_tokens=tokenize(q); sources=[]
+    for key, score in fused:
+        lex=lexical.get(key); vec=vector.get(key)
+        sources.append({"document":doc_name(key), "chunk":lex["chunk"] if lex else int(key.rpartition("::chunk_")[2]),
+                        "score":round(score, 5), "bm25":lex["score"] if lex else None, "vector_distance":round(vec["score"], 4) if vec else None,
+                        "passage":lex["passage"] if lex else best_window(texts[key], q_tokens)})
+    answer="\n\n".join(s["passage"] for s in sources) if sources else f"No relevant information found for '{q}'. Try rephrasing."
+    return {"answer":answer, "sources":sources, "mode":mode, "retrievers":status}
+
+async def retrieve(q: str, k: int=3, collection: Optional[str]=None, mode: Optional[str]=None,
+                   budget: Optional[float]=None)->Dict[str, Any]:
+    """Answer text, scored sources and per-retriever outcome for `q`; `budget` caps the wait for a second retriever."""
+    collection=validate_collection(collection); mode=mode or RETRIEVAL_MODE
+    if mode not in MODES: raise ValueError(f"Unknown retrieval mode {mode!r}; use one of {', '.join(MODES)}")
+    prepared=await offload(_prepare, q, k, collection, mode)
+    if prepared is None:
+        return {"answer":"No documents indexed yet. Upload PDF or TXT files first.", "sources":[], "mode":mode, "retrievers":{}}
+    mode, store, cache_key, cached=prepared
+    rag_query_cache.inc(result="hit" if cached is not None else "miss")
+    if cached is not None: return cached
+
+    depth=max(4*k, 20)
+    tasks={"bm25":to_cpu(_timed, "bm25", rag_service.search, q, depth, collection)}
+    if store is not None: tasks["vector"]=to_cpu(_timed, "vector", store.similarity_search, q, depth)
+    budget=HYBRID_BUDGET_S if budget is None else budget
+    deadline=time.monotonic()+budget; pending=set(tasks.values()); have_result=False
+    while pending:
+        # until some retriever has succeeded there is nothing to fall back on: wait (the caller's limiter bounds it)
+        done, pending=await asyncio.wait(pending, timeout=max(0.0, deadline-time.monotonic()) if have_result else None,
+                                         return_when=asyncio.FIRST_COMPLETED)
+        if not done: break
+        have_result=have_result or any(f.exception() is None for f in done)
+    status: Dict[str, str]={}; results: Dict[str, list]={}
+    for name, fut in tasks.items():
+        if not fut.done(): status[name]="timeout"   # the thread finishes in the background, holding the limiter slot; its result is dropped
+        elif fut.exception() is not None:
+            status[name]="error"; logger.error(f"{name} retrieval failed: {fut.exception()}")
+        else: status[name]="ok"; results[name]=fut.result()
+        rag_retriever_outcomes.inc(retriever=name, outcome=status[name])
+    if not results: raise next(f.exception() for f in tasks.values())   # every retriever failed
+
+    out=await offload(_fuse, q, k, collection, mode, results, status)
+    if all(v=="ok" for v in status.values()): query_cache.put(cache_key, out)
+    return out
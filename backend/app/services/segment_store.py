@@ -0,0 +1,314 @@
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from collections.abc import Mapping
+import os, re, mmap, zlib, struct, threading, logging
+try: import fcntl
+except ImportError: fcntl=None   # no inter-process lock on Windows
+
+logger=logging.getLogger(__name__)
+
+FRAME=struct.Struct("<II")   # payload length, crc32 of payload
+REC=struct.Struct("<BII")    # op, key length, value length
+PUT, DEL, BASE = 1, 2, 3
+SEG_RE=re.compile(r"^seg-(\d{8})\.log$")
+_open_paths=set()   # real paths of the stores open in this process; flock alone cannot tell our own lock from another process's
+_open_lock=threading.Lock()
+
+class SegmentStore(Mapping):
+    """
+    Append-only key -> text store split into segment files.
+
+    Every append() is one CRC-checked frame, so a crash mid-write only drops that frame.
+    Only locations are kept in memory; values are read back through mmap.
+    Sealed segments are merged by a background compaction into a single BASE segment.
+
+    Offsets come from this process's file handle and compaction deletes sealed files, so a store
+    directory has a single writer process: an exclusive flock on its LOCK file is held while open.
+    Opening it from a second process raises RuntimeError, or with shared=True opens it read-only:
+    the log is replayed without truncating or compacting, the replayed files are kept open so a
+    compaction cannot pull data away, and refresh() picks up later frames (taking over as writer
+    once the lock is free).
+    """
+    def __init__(self, path: str, segment_bytes: int=64<<20, compact_segments: int=8, shared: bool=False):
+        self.path=path
+        self.segment_bytes=segment_bytes
+        self.compact_segments=compact_segments
+        self.loc: Dict[str, Tuple[int,int,int]]={}   # key -> (segment id, value offset, value length)
+        self._maps: Dict[int, Tuple[mmap.mmap,int]]={}
+        self._lock=threading.RLock()
+        self._compacting=False
+        self._fh=None; self._active_id=0
+        self.readonly=False; self.owner: Optional[str]=None   # read-only: pid of the writer process
+        self._files: Dict[int, Tuple[BinaryIO,int]]={}   # read-only: segment id -> (replayed file, inode)
+        self._tail=(0, 0)                                # read-only: (last segment id, end of its last good frame)
+        os.makedirs(path, exist_ok=True)
+        self._real=os.path.realpath(path)
+        with _open_lock:
+            if self._real in _open_paths: raise RuntimeError(f"{self.path} is already open in this process; close it before opening it again")
+            _open_paths.add(self._real); self._registered=True
+        try: self._lockfile, owner=self._try_lock()
+        except BaseException: self._unregister(); raise
+        if self._lockfile is None:
+            if not shared:
+                self._unregister()
+                raise RuntimeError(f"{self.path} is open in another process (pid {owner}); a segment store has a single writer process")
+            self.readonly=True; self.owner=owner
+        try: self._replay() if self.readonly else self._open()
+        except BaseException: self.close(); raise
+
+    # ---- Mapping interface ----
+    def __getitem__(self, key: str)->str:
+        with self._lock:
+            loc=self.loc.get(key)
+            if loc is None: raise KeyError(key)
+            return self._read(*loc)
+    def __iter__(self)->Iterator[str]: return iter(list(self.loc))
+    def __len__(self)->int: return len(self.loc)
+    def __contains__(self, key)->bool: return key in self.loc
+
+    # ---- files ----
+    def _file(self, sid: int)->str: return os.path.join(self.path, f"seg-{sid:08d}.log")
+
+    def segments(self)->List[int]:
+        return sorted(int(m.group(1)) for m in (SEG_RE.match(n) for n in os.listdir(self.path)) if m)
+
+    @property
+    def written(self)->bool:
+        """Whether anything was ever appended, even if every key has since been deleted."""
+        return any(os.path.getsize(self._file(sid)) for sid in self.segments())
+
+    def _frames(self, buf, size: int, pos: int=0)->Iterator[Tuple[int,int]]:
+        while pos+FRAME.size<=size:
+            n, crc=FRAME.unpack_from(buf, pos)
+            end=pos+FRAME.size+n
+            if end>size or zlib.crc32(buf[pos+FRAME.size:end])!=crc: return
+            yield pos+FRAME.size, end
+            pos=end
+
+    def _records(self, buf, start: int, end: int)->Iterator[Tuple[int,str,int,int]]:
+        pos=start
+        while pos<end:
+            op, kl, vl=REC.unpack_from(buf, pos); pos+=REC.size
+            key=bytes(buf[pos:pos+kl]).decode("utf-8"); pos+=kl
+            yield op, key, pos, vl
+            pos+=vl
+
+    def _try_lock(self)->Tuple[Optional[BinaryIO], Optional[str]]:
+        """Take the writer lock: (lock file, None), or (None, owner pid) if another process holds it."""
+        f=open(os.path.join(self.path, "LOCK"), "a+")
+        if fcntl is None: return f, None
+        try: fcntl.flock(f.fileno(), fcntl.LOCK_EX|fcntl.LOCK_NB)
+        except OSError:
+            f.seek(0); owner=f.read().strip() or "unknown"; f.close()
+            return None, owner
+        f.truncate(0); f.write(str(os.getpid())); f.flush()
+        return f, None
+
+    def _release(self):
+        if self._lockfile is None: return
+        if fcntl is not None: fcntl.flock(self._lockfile.fileno(), fcntl.LOCK_UN)
+        self._lockfile.close(); self._lockfile=None
+
+    def _is_base(self, sid: int)->bool:
+        with open(self._file(sid), "rb") as f: head=f.read(FRAME.size+REC.size)
+        return len(head)==FRAME.size+REC.size and head[FRAME.size]==BASE
+
+    def _open(self):
+        sids=self.segments()
+        base=next((s for s in reversed(sids) if self._is_base(s)), None)
+        if base is not None:
+            for s in [s for s in sids if s<base]: os.remove(self._file(s))
+            sids=[s for s in sids if s>=base]
+        for sid in sids:
+            size=os.path.getsize(self._file(sid))
+            good=0
+            if size:
+                with open(self._file(sid), "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    for start, end in self._frames(m, size):
+                        for op, key, off, vl in self._records(m, start, end):
+                            if op==PUT: self.loc[key]=(sid, off, vl)
+                            elif op==DEL: self.loc.pop(key, None)
+                        good=end
+            if good<size:
+                logger.warning(f"Segment {sid}: dropping {size-good} bytes of torn/corrupt data")
+                with open(self._file(sid), "r+b") as f: f.truncate(good)
+        self._active_id=sids[-1] if sids else 1
+        self._fh=open(self._file(self._active_id), "ab")
+        logger.info(f"Opened {len(sids)} segments with {len(self.loc)} keys from {self.path}")
+
+    # ---- read-only replay ----
+    def _replay(self):
+        for _ in range(5):
+            self._drop_files()
+            try:
+                for sid in self.segments():
+                    f=open(self._file(sid), "rb"); self._files[sid]=(f, os.fstat(f.fileno()).st_ino)
+                break
+            except FileNotFoundError: continue   # a compaction removed a segment between listdir and open
+        else: raise RuntimeError(f"{self.path} kept changing while it was opened read-only")
+        base=next((s for s in reversed(self._files) if self._head_is_base(self._files[s][0])), None)
+        for sid in [s for s in self._files if base is not None and s<base]: self._files.pop(sid)[0].close()
+        self.loc={}; self._tail=(0, 0)
+        for sid in self._files: self._tail=(sid, self._scan(sid, 0))
+        logger.info(f"Opened {len(self._files)} segments with {len(self.loc)} keys read-only from {self.path} (writer pid {self.owner})")
+
+    @staticmethod
+    def _head_is_base(f: BinaryIO)->bool:
+        f.seek(0); head=f.read(FRAME.size+REC.size)
+        return len(head)==FRAME.size+REC.size and head[FRAME.size]==BASE
+
+    def _scan(self, sid: int, pos: int, changed: Optional[Dict[str, Optional[str]]]=None)->int:
+        """Apply the complete frames of a replayed segment from `pos`; returns the end of the last one."""
+        f=self._files[sid][0]; size=os.fstat(f.fileno()).st_size
+        if size<=pos: return pos
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            for start, end in self._frames(m, size, pos):
+                for op, key, off, vl in self._records(m, start, end):
+                    if changed is not None and key not in changed:
+                        changed[key]=self._read(*self.loc[key]) if key in self.loc else None
+                    if op==PUT: self.loc[key]=(sid, off, vl)
+                    elif op==DEL: self.loc.pop(key, None)
+                pos=end   # a frame still being written is picked up by the next call
+        return pos
+
+    def _replaced(self, sid: int, ino: int)->bool:
+        try: return os.stat(self._file(sid)).st_ino!=ino
+        except FileNotFoundError: return True
+
+    def _drop_files(self):
+        for m, _ in self._maps.values(): m.close()
+        for f, _ in self._files.values(): f.close()
+        self._maps.clear(); self._files.clear()
+
+    def refresh(self)->Optional[Dict[str, Optional[str]]]:
+        """
+        Read-only stores: apply what the writer appended since the last call and return the previous
+        value (None if it was absent) of every key that changed. Returns None when the store was loaded
+        again from scratch instead: the writer compacted, or the lock was free and this process took over.
+        """
+        if not self.readonly: return {}
+        with self._lock:
+            lock, owner=self._try_lock()
+            if lock is not None:
+                self._drop_files(); self.loc={}
+                self._lockfile=lock; self.readonly=False; self.owner=None
+                logger.info(f"Taking over {self.path} as writer")
+                self._open(); return None
+            self.owner=owner
+            if any(self._replaced(sid, ino) for sid, (_, ino) in self._files.items()):
+                self._replay(); return None
+            changed: Dict[str, Optional[str]]={}
+            sid, pos=self._tail
+            if sid in self._files: self._tail=(sid, self._scan(sid, pos, changed))
+            for new in [s for s in self.segments() if s>sid]:
+                try: f=open(self._file(new), "rb")
+                except FileNotFoundError: self._replay(); return None
+                self._files[new]=(f, os.fstat(f.fileno()).st_ino)
+                if self._head_is_base(f): self._replay(); return None
+                self._tail=(new, self._scan(new, 0, changed))
+            return changed
+
+    def _rotate(self):
+        self._fh.close()
+        self._active_id+=1
+        self._fh=open(self._file(self._active_id), "ab")
+
+    def _read(self, sid: int, off: int, n: int)->str:
+        m=self._maps.get(sid)
+        if m is None or off+n>m[1]:
+            if m: m[0].close()
+            if sid in self._files: m=self._map(self._files[sid][0])   # read-only: the replayed file, even if since replaced
+            else:
+                with open(self._file(sid), "rb") as f: m=self._map(f)
+            self._maps[sid]=m
+        return m[0][off:off+n].decode("utf-8")
+
+    @staticmethod
+    def _map(f: BinaryIO)->Tuple[mmap.mmap,int]:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), os.fstat(f.fileno()).st_size
+
+    # ---- writes ----
+    @staticmethod
+    def _encode(ops: Iterable[Tuple[int,str,Optional[str]]])->Tuple[bytes, List[Tuple[int,str,int,int]]]:
+        parts=[]; index=[]; pos=0
+        for op, key, val in ops:
+            kb=key.encode("utf-8"); vb=(val or "").encode("utf-8")
+            parts.append(REC.pack(op, len(kb), len(vb))); parts.append(kb); parts.append(vb)
+            pos+=REC.size+len(kb); index.append((op, key, pos, len(vb))); pos+=len(vb)
+        return b"".join(parts), index
+
+    def append(self, ops: Iterable[Tuple[int,str,Optional[str]]]):
+        payload, index=self._encode(ops)
+        if not index: return
+        with self._lock:
+            if self.readonly: raise RuntimeError(f"{self.path} is open read-only in this process; pid {self.owner} is its writer")
+            if self._fh.tell()>=self.segment_bytes: self._rotate()
+            start=self._fh.tell()+FRAME.size
+            self._fh.write(FRAME.pack(len(payload), zlib.crc32(payload))+payload)
+            self._fh.flush(); os.fsync(self._fh.fileno())
+            for op, key, off, vl in index:
+                if op==PUT: self.loc[key]=(self._active_id, start+off, vl)
+                elif op==DEL: self.loc.pop(key, None)
+        self.maybe_compact()
+
+    def put_many(self, items: Iterable[Tuple[str,str]]): self.append((PUT, k, v) for k, v in items)
+    def delete_many(self, keys: Iterable[str]): self.append((DEL, k, None) for k in keys)
+
+    # ---- compaction ----
+    def maybe_compact(self):
+        with self._lock:
+            if self.readonly or self._compacting or len(self.segments())<self.compact_segments: return
+            self._compacting=True
+        threading.Thread(target=self._compact_bg, name="segment-compaction", daemon=True).start()
+
+    def _compact_bg(self):
+        try: self.compact()
+        except Exception as e: logger.error(f"Compaction error in {self.path}: {e}")
+        finally:
+            with self._lock: self._compacting=False
+
+    def compact(self):
+        """Merge all sealed segments into one BASE segment that supersedes every older file."""
+        with self._lock:
+            if self.readonly: return
+            self._rotate()
+            sealed=[s for s in self.segments() if s<self._active_id]
+            if not sealed: return
+            target=sealed[-1]
+            live=[(k, loc) for k, loc in self.loc.items() if loc[0]<=target]
+        tmp=self._file(target)+".tmp"
+        moved=[]
+        with open(tmp, "wb") as out:
+            batch=[(BASE, "", None)]; size=0
+            def flush():
+                if not batch: return
+                payload, index=self._encode(batch)
+                start=out.tell()+FRAME.size
+                out.write(FRAME.pack(len(payload), zlib.crc32(payload))+payload)
+                moved.extend((key, (target, start+off, vl)) for op, key, off, vl in index if op==PUT)
+            for key, loc in live:
+                with self._lock: val=self._read(*loc)
+                batch.append((PUT, key, val)); size+=len(val)
+                if size>=4<<20: flush(); batch=[]; size=0
+            flush()
+            out.flush(); os.fsync(out.fileno())
+        with self._lock:
+            old=dict(live)
+            os.replace(tmp, self._file(target))
+            for key, loc in moved:
+                if self.loc.get(key)==old.get(key): self.loc[key]=loc
+            for sid in sealed:
+                m=self._maps.pop(sid, None)
+                if m: m[0].close()
+                if sid!=target: os.remove(self._file(sid))
+        logger.info(f"Compacted {len(sealed)} segments into seg-{target:08d} ({len(moved)} keys)")
+
+    def close(self):
+        with self._lock:
+            if self._fh: self._fh.close(); self._fh=None
+            self._drop_files()
+            self._release()
+        self._unregister()
+
+    def _unregister(self):
+        with _open_lock:
+            if self._registered: _open_paths.discard(self._real); self._registered=False
@@ -0,0 +1,202 @@
+from typing import Optional, Dict, Tuple, TYPE_CHECKING
+from collections import OrderedDict
+import os, json, time, atexit, sqlite3, secrets, logging, threading
+
+if TYPE_CHECKING:
+    from app.services.flow_service import FlowSession
+
+logger=logging.getLogger(__name__)
+
+def mono_to_wall(t: float)->float: return time.time()-(time.monotonic()-t)
+def wall_to_mono(t: float)->float: return time.monotonic()-(time.time()-t)
+
+class SessionStore:
+    """
+    Where FlowService keeps FlowSession objects. put() must be safe to call from the event loop;
+    stores whose get() does I/O set `blocking` and FlowService calls get() from a worker thread.
+    """
+    blocking=False
+    def get(self, sid: str)->Optional["FlowSession"]: raise NotImplementedError
+    def put(self, s: "FlowSession"): raise NotImplementedError
+    def delete(self, sid: str): raise NotImplementedError
+    def __len__(self)->int: raise NotImplementedError
+    def flush(self): pass
+    def close(self): self.flush()
+
+class MemorySessionStore(SessionStore):
+    """Per-process dict ordered by last activity; expiry and capacity eviction pop from the front."""
+    def __init__(self, timeout_s: float, max_sessions: int):
+        self.timeout_s=timeout_s; self.max_sessions=max_sessions
+        self.sessions: "OrderedDict[str, FlowSession]"=OrderedDict()
+        self.evicted=0
+
+    def get(self, sid: str)->Optional["FlowSession"]: return self.sessions.get(sid)
+
+    def put(self, s: "FlowSession"):
+        self.sessions[s.session_id]=s; self.sessions.move_to_end(s.session_id)
+        self._sweep()
+
+    def delete(self, sid: str): self.sessions.pop(sid, None)
+    def __len__(self)->int: return len(self.sessions)
+
+    def _sweep(self):
+        now=time.monotonic()
+        while self.sessions:
+            sid, s=next(iter(self.sessions.items()))
+            if now<=s.last_activity+self.timeout_s and len(self.sessions)<=self.max_sessions: break
+            del self.sessions[sid]; self.evicted+=1
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions shared by all workers on a node through one SQLite database in WAL mode.
+
+    Reads go through a local LRU cache validated by a per-row version token (one indexed
+    lookup instead of a full row decode). Writes are buffered and flushed in batches by a
+    background thread every `flush_interval` seconds or once `batch_size` sessions are dirty.
+    Writes use their own connection and lock, so a flush waiting on another worker's write
+    lock never holds up get(); a failed batch is re-queued.
+    """
+    blocking=True
+
+    def __init__(self, path: str, timeout_s: float, max_sessions: int, flush_interval: float=0.05,
+                 batch_size: int=256, cache_size: int=10000, sweep_interval: float=30.0):
+        from app.services.flow_service import FlowSession
+        self._cls=FlowSession
+        self.path=path; self.timeout_s=timeout_s; self.max_sessions=max_sessions
+        self.flush_interval=flush_interval; self.batch_size=batch_size
+        self.cache_size=cache_size; self.sweep_interval=sweep_interval
+        self.cache: "OrderedDict[str, Tuple[int, FlowSession]]"=OrderedDict()
+        self.dirty: Dict[str, "FlowSession"]={}
+        self.flushing: Dict[str, "FlowSession"]={}   # batch being written; still served by get()
+        self.evicted=0
+        self._lock=threading.Lock()          # cache, dirty and the read connection
+        self._write_lock=threading.Lock()    # the write connection; one batch in flight
+        self._wake=threading.Event()
+        self._stop=False
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn=self._connect(); self._wconn=self._connect()
+        self._wconn.executescript(
+            "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, version INTEGER NOT NULL, last_activity REAL NOT NULL, data TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS sessions_last_activity ON sessions(last_activity);")
+        self._thread=threading.Thread(target=self._writer, name="session-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        logger.info(f"SQLite session store at {path} (flush every {flush_interval}s / {batch_size} sessions)")
+
+    def _connect(self)->sqlite3.Connection:
+        conn=sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL"); conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ---- (de)serialization ----
+    def _dump(self, s: "FlowSession")->str:
+        return json.dumps({"flow_data":s.flow_data.model_dump(mode="json"), "created_at":mono_to_wall(s.created_at),
+                           "status":s.status.value, "retry_count":s.retry_count, "metadata":s.metadata,
+                           "history":[[mono_to_wall(h[0]), *h[1:]] for h in s.history]}, ensure_ascii=False)
+
+    def _load(self, sid: str, last_activity: float, data: str)->"FlowSession":
+        from app.models.flow import FlowData
+        from app.services.flow_service import SessionStatus
+        d=json.loads(data); s=self._cls(sid)
+        s.flow_data=FlowData(**d["flow_data"]); s.created_at=wall_to_mono(d["created_at"])
+        s.last_activity=wall_to_mono(last_activity); s.status=SessionStatus(d["status"])
+        s.retry_count=d["retry_count"]; s.metadata=d["metadata"]
+        s.history.extend((wall_to_mono(h[0]), *h[1:]) for h in d["history"])
+        return s
+
+    # ---- SessionStore ----
+    def get(self, sid: str)->Optional["FlowSession"]:
+        with self._lock:
+            if sid in self.dirty: return self.dirty[sid]
+            if sid in self.flushing: return self.flushing[sid]
+            cached=self.cache.get(sid)
+            row=self._conn.execute("SELECT version FROM sessions WHERE id=?", (sid,)).fetchone()
+            if row is None: self.cache.pop(sid, None); return None
+            if cached and cached[0]==row[0]: self.cache.move_to_end(sid); return cached[1]
+            row=self._conn.execute("SELECT version, last_activity, data FROM sessions WHERE id=?", (sid,)).fetchone()
+            if row is None: return None
+            s=self._load(sid, row[1], row[2]); self._cache(sid, row[0], s)
+            return s
+
+    def put(self, s: "FlowSession"):
+        with self._lock:
+            self.dirty[s.session_id]=s
+            n=len(self.dirty)
+        if n>=self.batch_size: self._wake.set()
+
+    def delete(self, sid: str):
+        with self._lock: self.dirty.pop(sid, None); self.cache.pop(sid, None)
+        with self._write_lock: self._wconn.execute("DELETE FROM sessions WHERE id=?", (sid,))
+
+    def __len__(self)->int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]+sum(1 for sid in self.dirty if sid not in self.cache)
+
+    def _cache(self, sid: str, version: int, s: "FlowSession"):
+        self.cache[sid]=(version, s); self.cache.move_to_end(sid)
+        while len(self.cache)>self.cache_size: self.cache.popitem(last=False)
+
+    # ---- write-behind ----
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                if not self.dirty: return
+                batch, self.dirty=self.dirty, {}
+                self.flushing=batch
+            rows=[]; ok=False
+            try:
+                rows=[(sid, secrets.randbits(62), mono_to_wall(s.last_activity), self._dump(s)) for sid, s in batch.items()]
+                self._wconn.execute("BEGIN IMMEDIATE")
+                self._wconn.executemany("INSERT INTO sessions (id, version, last_activity, data) VALUES (?,?,?,?) "
+                                        "ON CONFLICT(id) DO UPDATE SET version=excluded.version, last_activity=excluded.last_activity, data=excluded.data", rows)
+                self._wconn.execute("COMMIT"); ok=True
+            except Exception:
+                if self._wconn.in_transaction:   # BEGIN IMMEDIATE itself fails when another worker holds the lock
+                    try: self._wconn.execute("ROLLBACK")
+                    except sqlite3.Error as e: logger.error(f"Session store rollback failed: {e}")
+                raise
+            finally:
+                with self._lock:
+                    self.flushing={}
+                    if ok:
+                        for (sid, version, _, _), s in zip(rows, batch.values()): self._cache(sid, version, s)
+                    else:
+                        for sid, s in batch.items(): self.dirty.setdefault(sid, s)   # newer puts win
+
+    def sweep(self):
+        """Delete sessions idle past the timeout, then the oldest ones beyond max_sessions."""
+        with self._write_lock:
+            cur=self._wconn.execute("DELETE FROM sessions WHERE last_activity<?", (time.time()-self.timeout_s,))
+            n=cur.rowcount
+            over=self._wconn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]-self.max_sessions
+            if over>0:
+                self._wconn.execute("DELETE FROM sessions WHERE id IN (SELECT id FROM sessions ORDER BY last_activity LIMIT ?)", (over,))
+                n+=over
+            self.evicted+=n
+            if n: logger.info(f"Session store evicted {n} sessions")
+
+    def _writer(self):
+        last_sweep=time.monotonic()
+        while not self._stop:
+            self._wake.wait(self.flush_interval); self._wake.clear()
+            try:
+                self.flush()
+                if time.monotonic()-last_sweep>=self.sweep_interval: self.sweep(); last_sweep=time.monotonic()
+            except Exception as e:
+                logger.error(f"Session store flush error: {e}")
+
+    def close(self):
+        if self._stop: return
+        self._stop=True; self._wake.set()
+        self._thread.join(timeout=2)
+        try: self.flush()
+        except Exception as e: logger.error(f"Session store final flush error: {e}")
+
+def make_session_store(timeout_s: float, max_sessions: int)->SessionStore:
+    kind=os.getenv("FLOW_SESSION_STORE", "memory").lower()
+    if kind=="sqlite":
+        return SQLiteSessionStore(os.getenv("FLOW_SESSION_DB", "data/sessions.db"), timeout_s, max_sessions,
+                                  flush_interval=float(os.getenv("FLOW_SESSION_FLUSH_MS", "50"))/1000,
+                                  batch_size=int(os.getenv("FLOW_SESSION_BATCH", "256")))
+    if kind!="memory": logger.warning(f"Unknown FLOW_SESSION_STORE={kind!r}; using memory")
+    return MemorySessionStore(timeout_s, max_sessions)
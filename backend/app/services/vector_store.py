@@ -1,64 +1,306 @@
 import os
+import json
 import pickle
-from typing import List, Dict, Any, Optional
+import argparse
+import threading
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
 
+import faiss
+import numpy as np
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.document_loaders import TextLoader
 from langchain_community.document_loaders.pdf import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 
+from app.services.embedding_cache import EmbeddingCache, text_hash
+from app.services import faiss_index
+from app.services.faiss_snapshot import SnapshotManager, WriteAheadLog, atomic_write
+
 import logging
 logger = logging.getLogger(__name__)
 
 class VectorStore:
     """
-    Minimal FAISS vector store wrapper with HuggingFace embeddings.
+    FAISS vector store wrapper with HuggingFace embeddings.
+
+    The index type is configurable (flat, ivf, hnsw) with optional sq8/pq quantization;
+    IVF and PQ are trained on the first batch and can be retrained with rebuild().
+    With mmap=True the index is memory-mapped read-only and copied into RAM on first write.
+
+    Construction is cheap: the embedding model and the index are loaded by load() (called
+    implicitly on first use) so that callers can defer it to a background warm-up.
+
+    Additions are appended to a write-ahead log and snapshotted to disk in the background,
+    debounced by `snapshot_debounce` seconds and at most `snapshot_max_delay` seconds late;
+    load() replays logged additions that the last snapshot does not contain.
+
+    delete() and delete_source() remove vectors (e.g. older versions of a re-uploaded document).
+    HNSW indexes cannot remove vectors, so there the ids are tombstoned, filtered out of search
+    results and dropped for good by the next rebuild(), which starts in the background once
+    tombstones exceed `rebuild_tombstones` of the index.
     """
     def __init__(
         self,
         persist_dir: str = "vector_db/faiss_store",
         model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
         chunk_size: int = 900,
-        chunk_overlap: int = 150
+        chunk_overlap: int = 150,
+        embed_batch_size: int = int(os.getenv("EMBED_BATCH_SIZE", "256")),
+        index_type: str = os.getenv("FAISS_INDEX_TYPE", "flat"),
+        quantization: Optional[str] = os.getenv("FAISS_QUANTIZATION") or None,
+        nlist: int = int(os.getenv("FAISS_NLIST", "1024")),
+        nprobe: Optional[int] = int(os.getenv("FAISS_NPROBE", "0")) or None,
+        hnsw_m: int = int(os.getenv("FAISS_HNSW_M", "32")),
+        ef_search: Optional[int] = int(os.getenv("FAISS_EF_SEARCH", "0")) or None,
+        pq_m: int = int(os.getenv("FAISS_PQ_M", "16")),
+        mmap: bool = os.getenv("FAISS_MMAP", "0") == "1",
+        snapshot_debounce: float = float(os.getenv("FAISS_SNAPSHOT_DEBOUNCE_S", "2")),
+        snapshot_max_delay: float = float(os.getenv("FAISS_SNAPSHOT_MAX_DELAY_S", "30")),
+        rebuild_tombstones: float = float(os.getenv("FAISS_REBUILD_TOMBSTONES", "0.2"))
     ):
         self.persist_dir = persist_dir
         os.makedirs(self.persist_dir, exist_ok=True)
         self.index_path = os.path.join(self.persist_dir, "index.faiss")
-        self.store_path = os.path.join(self.persist_dir, "store.pkl")
+        self.store_path = os.path.join(self.persist_dir, "index.pkl")
+        self.meta_path = os.path.join(self.persist_dir, "index_meta.json")
+        self.wal_path = os.path.join(self.persist_dir, "wal.jsonl")
+
+        self.index_type = index_type
+        self.quantization = quantization
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.pq_m = pq_m
+        self.mmap = mmap
+        self.rebuild_tombstones = rebuild_tombstones
+        self._rebuilder: Optional[threading.Thread] = None
+        self.meta: Dict[str, Any] = {}
+        self._mmapped = False
 
-        self.embeddings = HuggingFaceEmbeddings(model_name=model_name)
+        self.model_name = model_name
+        self.embed_batch_size = embed_batch_size
+        self._embeddings = None
+        self.embedding_cache = EmbeddingCache(os.path.join(self.persist_dir, "embeddings.sqlite"), namespace=model_name)
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size, chunk_overlap=chunk_overlap, separators=["\n\n", "\n", ".", " "]
         )
 
         self.vs: Optional[FAISS] = None
-        self._load()
+        self.ids: Set[str] = set()
+        self.deleted: Set[str] = set()  # tombstones for indexes without remove_ids (HNSW)
+        self.generation = 0
+        self.loaded = False
+        self._load_lock = threading.Lock()
+        self._lock = threading.RLock()  # guards self.vs / self.ids against concurrent add, search and snapshot capture
+        self.wal: Optional[WriteAheadLog] = None
+        self.snapshots = SnapshotManager(
+            self._capture, self._write_snapshot, debounce=snapshot_debounce, max_delay=snapshot_max_delay
+        )
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            from langchain_huggingface import HuggingFaceEmbeddings
+            self._embeddings = HuggingFaceEmbeddings(
+                model_name=self.model_name, encode_kwargs={"batch_size": self.embed_batch_size}
+            )
+        return self._embeddings
+
+    def load(self):
+        """Load the embedding model and the persisted index once; safe to call from several threads."""
+        if self.loaded:
+            return
+        with self._load_lock:
+            if not self.loaded:
+                self.embeddings  # instantiate the model here rather than on the first request
+                self._load()
+                self.loaded = True
+
+    def warm_up(self):
+        """Load everything and run a dummy embedding and search so the first request is not the slow one."""
+        self.load()
+        vector = self.embeddings.embed_query("warm up")
+        if self.vs is not None and self.vs.index.ntotal:
+            self.vs.index.search(np.asarray([vector], dtype=np.float32), 1)
 
     def _load(self):
         try:
             if os.path.exists(self.index_path) and os.path.exists(self.store_path):
-                self.vs = FAISS.load_local(
-                    self.persist_dir,
-                    self.embeddings,
-                    allow_dangerous_deserialization=True
-                )
-                logger.info("FAISS vector store loaded")
+                index = faiss_index.read_index(self.index_path, mmap=self.mmap)
+                with open(self.store_path, "rb") as f:
+                    docstore, index_to_docstore_id = pickle.load(f)
+                self.vs = FAISS(self.embeddings, index, docstore, index_to_docstore_id)
+                self._tune()
+                self._mmapped = self.mmap
+                self.ids = set(self.vs.index_to_docstore_id.values())
+                if os.path.exists(self.meta_path):
+                    with open(self.meta_path, "r", encoding="utf-8") as f:
+                        self.meta = json.load(f)
+                self.deleted = set(self.meta.get("deleted", [])) & self.ids
+                if index.ntotal != len(index_to_docstore_id) and index_to_docstore_id:
+                    # a crash between the docstore and index renames of a snapshot; the docstore is authoritative
+                    logger.warning(f"FAISS index has {index.ntotal} vectors for {len(index_to_docstore_id)} documents; re-indexing")
+                    self.vs, self.meta = self._refill(
+                        *self._live_docs(), self.meta.get("index_type") or self.index_type, self.meta.get("quantization")
+                    )
+                    self.ids = set(self.vs.index_to_docstore_id.values())
+                    self.deleted = set()
+                    self._tune()
+                    self._mmapped = False
+                    self.snapshots.request()
+                logger.info(f"FAISS vector store loaded ({faiss_index.describe(index)}, mmap={self.mmap})")
             else:
                 self.vs = None
         except Exception as e:
             logger.error(f"Error loading FAISS store: {e}")
             self.vs = None
+        self.wal = WriteAheadLog(self.wal_path)
+        self._replay()
+
+    def _replay(self):
+        """Re-apply logged changes missing from the snapshot; vectors come from the embedding cache."""
+        last: Dict[str, Dict[str, Any]] = {}
+        for r in self.wal.read():
+            last[r["id"]] = r  # only the last operation per id matters
+        records = {i: r for i, r in last.items() if r.get("op") != "delete" and not self._present(i)}
+        drop = [i for i, r in last.items() if r.get("op") == "delete" and self._present(i)]
+        if records:
+            ids = list(records)
+            texts = [records[i]["text"] for i in ids]
+            vectors = self.embedding_cache.embed(texts, self.embeddings.embed_documents, self.embed_batch_size)
+            self._apply(ids, texts, vectors, [records[i]["metadata"] for i in ids])
+        if drop:
+            self._remove(drop)
+        if records or drop:
+            self.snapshots.request()
+            logger.info(f"Replayed {len(records)} additions and {len(drop)} deletions from {self.wal_path}")
+
+    def _present(self, id_: str) -> bool:
+        return id_ in self.ids and id_ not in self.deleted
+
+    def _apply(self, ids: List[str], texts: List[str], vectors: np.ndarray, metadatas: List[Dict[str, Any]]):
+        revived = self.deleted.intersection(ids)
+        if revived:
+            # tombstoned earlier but still in the index; ids embed the content hash, so the vector is unchanged
+            self._set_deleted(self.deleted - revived)
+            keep = [j for j, i in enumerate(ids) if i not in revived]
+            ids, texts = [ids[j] for j in keep], [texts[j] for j in keep]
+            vectors, metadatas = vectors[keep], [metadatas[j] for j in keep]
+            if not ids:
+                self.generation += 1
+                return
+        if self.vs is None:
+            self.vs, self.meta = self._new_store(vectors, self.index_type, self.quantization)
+            self._tune()
+        self._ensure_writable()
+        self.vs.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+        self.ids.update(ids)
+        self.generation += 1
+
+    def _remove(self, ids: List[str]):
+        self._ensure_writable()
+        try:
+            self.vs.delete(ids)
+            self.ids.difference_update(ids)
+        except RuntimeError:  # the index cannot remove vectors (HNSW): hide them until rebuild()
+            self._set_deleted(self.deleted | set(ids))
+        self.generation += 1
+
+    def _set_deleted(self, deleted: Set[str]):
+        self.deleted = deleted
+        if deleted:
+            self.meta["deleted"] = sorted(deleted)
+        else:
+            self.meta.pop("deleted", None)
+
+    def _add(self, ids: List[str], texts: List[str], vectors: np.ndarray, metadatas: List[Dict[str, Any]]) -> int:
+        """Log, then apply, the additions not already present; the snapshot is left to the background writer."""
+        with self._lock:
+            keep = [j for j, i in enumerate(ids) if not self._present(i)]
+            if not keep:
+                return 0
+            ids, texts = [ids[j] for j in keep], [texts[j] for j in keep]
+            vectors, metadatas = vectors[keep], [metadatas[j] for j in keep]
+            self.wal.append([{"id": i, "text": t, "metadata": m} for i, t, m in zip(ids, texts, metadatas)])
+            self._apply(ids, texts, vectors, metadatas)
+        self.snapshots.request()
+        return len(ids)
+
+    def _capture(self) -> Optional[Dict[str, Any]]:
+        """Consistent copy of everything a snapshot needs, taken under the lock so writers pause only for the copy."""
+        with self._lock:
+            if self.vs is None:
+                return None
+            return {
+                "index": faiss.clone_index(self.vs.index),
+                "docstore": dict(self.vs.docstore._dict),
+                "index_to_docstore_id": dict(self.vs.index_to_docstore_id),
+                "meta": dict(self.meta),
+                "wal_offset": self.wal.tell(),
+            }
+
+    def _write_snapshot(self, state: Dict[str, Any]):
+        def write_store(tmp: str):
+            with open(tmp, "wb") as f:
+                pickle.dump((InMemoryDocstore(state["docstore"]), state["index_to_docstore_id"]), f)
+
+        def write_meta(tmp: str):
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state["meta"], f)
+
+        atomic_write(self.store_path, write_store)
+        atomic_write(self.index_path, lambda tmp: faiss.write_index(state["index"], tmp))
+        atomic_write(self.meta_path, write_meta)
+        self.wal.truncate_before(state["wal_offset"])
+        logger.info(f"FAISS snapshot written ({state['index'].ntotal} vectors)")
 
     def _save(self):
-        if not self.vs:
+        """Snapshot synchronously, e.g. after rebuild() or before exit."""
+        self.snapshots.request()
+        self.snapshots.flush()
+
+    def close(self):
+        if not self.loaded:
             return
-        try:
-            self.vs.save_local(self.persist_dir)
-            logger.info("FAISS vector store saved")
-        except Exception as e:
-            logger.error(f"Error saving FAISS store: {e}")
+        rebuilder = self._rebuilder
+        if rebuilder is not None:
+            rebuilder.join()
+        self.snapshots.close()
+        self.wal.close()
+        self.embedding_cache.close()
+
+    def _tune(self):
+        index = self.vs.index
+        faiss_index.tune(index, nprobe=self.nprobe or faiss_index.default_nprobe(index), ef_search=self.ef_search)
+
+    def _ensure_writable(self):
+        """A memory-mapped index is read-only: load a private in-RAM copy before adding vectors."""
+        if self._mmapped and self.vs is not None:
+            self.vs.index = faiss_index.read_index(self.index_path, mmap=False)
+            self._tune()
+            self._mmapped = False
+
+    def _new_store(self, vectors: np.ndarray, index_type: str, quantization: Optional[str]) -> Tuple[FAISS, Dict[str, Any]]:
+        """An empty store trained on `vectors`, and the index metadata to keep with it."""
+        arr = np.asarray(vectors, dtype=np.float32)
+        spec = faiss_index.index_spec(
+            index_type, quantization, n=len(arr), nlist=self.nlist, hnsw_m=self.hnsw_m, pq_m=self.pq_m, dim=arr.shape[1]
+        )
+        index = faiss_index.train_index(arr, spec)
+        meta = {"spec": spec, "index_type": index_type, "quantization": quantization, "trained_on": len(arr)}
+        logger.info(f"Created FAISS index {spec} trained on {len(arr)} vectors")
+        return FAISS(self.embeddings, index, InMemoryDocstore(), {}), meta
+
+    @staticmethod
+    def _add_matrix(vs: FAISS, ids: List[str], docs: List[Document], vectors: np.ndarray):
+        """Add existing documents with their vectors in one index.add() call, without per-row copies."""
+        start = len(vs.index_to_docstore_id)
+        vs.index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+        vs.docstore.add(dict(zip(ids, docs)))
+        vs.index_to_docstore_id.update({start + j: i for j, i in enumerate(ids)})
 
     def _to_documents(self, file_paths: List[str]) -> List[Document]:
         docs: List[Document] = []
@@ -79,6 +321,11 @@ class VectorStore:
         return docs
 
     def add_files(self, file_paths: List[str]) -> int:
+        """
+        Split and index files, skipping chunks whose content hash is already in the store.
+        New chunks are embedded in batches through the persistent embedding cache.
+        """
+        self.load()
         raw_docs = self._to_documents(file_paths)
         if not raw_docs:
             return 0
@@ -86,17 +333,156 @@ class VectorStore:
         if not split_docs:
             return 0
 
-        if self.vs is None:
-            self.vs = FAISS.from_documents(split_docs, self.embeddings)
-        else:
-            self.vs.add_documents(split_docs)
+        new_docs: Dict[str, Document] = {}
+        for doc in split_docs:
+            h = text_hash(doc.page_content)
+            if h not in self.ids and h not in new_docs:
+                new_docs[h] = doc
+        if not new_docs:
+            logger.info(f"All {len(split_docs)} chunks already indexed")
+            return 0
+
+        ids = list(new_docs)
+        texts = [new_docs[h].page_content for h in ids]
+        vectors = self.embedding_cache.embed(texts, self.embeddings.embed_documents, self.embed_batch_size, hashes=ids)
+        return self._add(ids, texts, vectors, [new_docs[h].metadata for h in ids])
+
+    def add_chunks(self, items: List[Tuple[str, str]], source: str) -> int:
+        """
+        Index chunks that were already extracted elsewhere, as (key, text) pairs.
+        The key becomes the docstore id (and metadata["key"]) so hits can be joined with the
+        keyword index; embeddings are looked up by content hash in the embedding cache.
+        """
+        self.load()
+        items = [(key, text) for key, text in dict(items).items() if not self._present(key)]
+        if not items:
+            return 0
+        ids = [key for key, _ in items]
+        texts = [text for _, text in items]
+        vectors = self.embedding_cache.embed(
+            texts, self.embeddings.embed_documents, self.embed_batch_size, hashes=[text_hash(t) for t in texts]
+        )
+        return self._add(ids, texts, vectors, [{"source": source, "key": k} for k in ids])
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Remove documents by id; deletions are logged to the write-ahead log like additions."""
+        self.load()
+        with self._lock:
+            ids = [i for i in dict.fromkeys(ids) if self._present(i)]
+            if not ids:
+                return 0
+            self.wal.append([{"op": "delete", "id": i} for i in ids])
+            self._remove(ids)
+        self.snapshots.request()
+        self._maybe_rebuild()
+        return len(ids)
+
+    def _maybe_rebuild(self):
+        """Start a background rebuild() once tombstones pass `rebuild_tombstones` of the index (0 disables)."""
+        with self._lock:
+            if self._rebuilder is not None or not self.rebuild_tombstones or not self.vs:
+                return
+            if len(self.deleted) <= self.rebuild_tombstones * self.vs.index.ntotal:
+                return
+            logger.info(f"{len(self.deleted)} of {self.vs.index.ntotal} FAISS vectors are tombstoned; rebuilding")
+            self._rebuilder = threading.Thread(target=self._rebuild_bg, name="faiss-rebuild", daemon=True)
+            self._rebuilder.start()
+
+    def _rebuild_bg(self):
+        try:
+            self.rebuild()
+        except Exception as e:
+            logger.error(f"FAISS rebuild failed: {e}")
+        finally:
+            with self._lock:
+                self._rebuilder = None
+
+    def delete_source(self, source: str, keep: Iterable[str] = ()) -> int:
+        """Remove every chunk indexed for `source` except the ids in `keep`."""
+        self.load()
+        keep = set(keep)
+        with self._lock:
+            if self.vs is None:
+                return 0
+            ids = [i for i, d in self.vs.docstore._dict.items() if d.metadata.get("source") == source and i not in keep]
+        return self.delete(ids)
+
+    def rebuild(self, index_type: Optional[str] = None, quantization: Optional[str] = "") -> Dict[str, Any]:
+        """
+        Re-train and re-fill the index from the docstore, e.g. to switch index type or to
+        retrain IVF/PQ centroids once the corpus has grown. Vectors come from the embedding cache.
+        quantization="" keeps the configured quantization; None disables it.
+
+        The new index is embedded and trained without holding the store lock, so searches and
+        additions continue meanwhile; changes made in the meantime are carried over at the swap.
+        """
+        self.load()
+        index_type = index_type or self.index_type
+        quantization = self.quantization if quantization == "" else quantization
+        with self._lock:
+            if not self.vs or not self.ids - self.deleted:
+                return self.info()
+            ids, docs = self._live_docs()
+            generation = self.generation
+        vs, meta = self._refill(ids, docs, index_type, quantization)
+        with self._lock:
+            gone: List[str] = []
+            if self.generation != generation:
+                live_ids, live_docs = self._live_docs()
+                built = set(ids)
+                extra = [j for j, i in enumerate(live_ids) if i not in built]
+                if extra:  # added during the rebuild: their vectors are already in the embedding cache
+                    extra_docs = [live_docs[j] for j in extra]
+                    vectors = self.embedding_cache.embed(
+                        [d.page_content for d in extra_docs], self.embeddings.embed_documents, self.embed_batch_size
+                    )
+                    self._add_matrix(vs, [live_ids[j] for j in extra], extra_docs, vectors)
+                live = set(live_ids)
+                gone = [i for i in ids if i not in live]
+            self.vs, self.meta = vs, meta
+            self.ids = set(vs.index_to_docstore_id.values())
+            self.deleted = set()
+            self.index_type, self.quantization = index_type, quantization
+            self._mmapped = False
+            self._tune()
+            if gone:  # deleted during the rebuild
+                self._remove(gone)
+            self.generation += 1
         self._save()
-        return len(split_docs)
+        return self.info()
+
+    def _live_docs(self) -> Tuple[List[str], List[Document]]:
+        """Ids and documents of the current docstore in index order, without tombstoned ones."""
+        ids = [self.vs.index_to_docstore_id[i] for i in sorted(self.vs.index_to_docstore_id)]
+        ids = [i for i in ids if i not in self.deleted]
+        return ids, [self.vs.docstore.search(i) for i in ids]
+
+    def _refill(
+        self, ids: List[str], docs: List[Document], index_type: str, quantization: Optional[str]
+    ) -> Tuple[FAISS, Dict[str, Any]]:
+        """A new index of the given type holding `docs`, built from one float32 matrix of cached embeddings."""
+        vectors = self.embedding_cache.embed([d.page_content for d in docs], self.embeddings.embed_documents, self.embed_batch_size)
+        vs, meta = self._new_store(vectors, index_type, quantization)
+        self._add_matrix(vs, ids, docs, vectors)
+        return vs, meta
 
     def similarity_search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        self.load()
         if not self.vs:
             return []
-        results = self.vs.similarity_search_with_score(query, k=k)
+        vector = self.embeddings.embed_query(query)
+        with self._lock:
+            ntotal = self.vs.index.ntotal
+            fetch = k + min(len(self.deleted), k)
+            while True:  # widen the fetch until tombstoned hits no longer crowd out k live ones
+                results = self.vs.similarity_search_with_score_by_vector(vector, k=fetch)
+                if not self.deleted:
+                    break
+                live = [(d, s) for d, s in results if d.id not in self.deleted]
+                if len(live) >= k or fetch >= ntotal:
+                    results = live[:k]
+                    break
+                fetch = min(fetch * 4, ntotal)
         out = []
         for doc, score in results:
             out.append({
@@ -107,10 +493,69 @@ class VectorStore:
         return out
 
     def info(self) -> Dict[str, Any]:
+        self.load()
         size = 0
         try:
             if self.vs and hasattr(self.vs, "index"):
                 size = int(self.vs.index.ntotal)
         except Exception:
             pass
-        return {"ntotal": size, "persist_dir": self.persist_dir}
+        trained_on = self.meta.get("trained_on") or 0
+        return {
+            "ntotal": size,
+            "persist_dir": self.persist_dir,
+            "index": self.meta,
+            "mmap": self._mmapped,
+            "needs_retrain": self.meta.get("index_type") == "ivf" and size > 4 * trained_on,
+            "tombstones": len(self.deleted),
+            "embedding_cache": {"hits": self.embedding_cache.hits, "misses": self.embedding_cache.misses},
+            "snapshot": self.snapshots.stats(),
+            "wal_bytes": self.wal.tell() if self.wal else 0,
+        }
+
+
+_vector_stores: Dict[str, VectorStore] = {}
+_vector_store_lock = threading.Lock()
+
+
+def get_vector_store(persist_dir: str = "vector_db/faiss_store") -> VectorStore:
+    """Process-wide VectorStore per directory, constructed on first call (loading still happens lazily)."""
+    store = _vector_stores.get(persist_dir)
+    if store is None:
+        with _vector_store_lock:
+            store = _vector_stores.get(persist_dir)
+            if store is None:
+                store = _vector_stores[persist_dir] = VectorStore(persist_dir=persist_dir)
+    return store
+
+
+def close_vector_stores():
+    """Write pending snapshots and close every VectorStore opened through get_vector_store()."""
+    with _vector_store_lock:
+        stores = list(_vector_stores.values())
+    for store in stores:
+        try:
+            store.close()
+        except Exception as e:
+            logger.error(f"Error closing vector store {store.persist_dir}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or rebuild the FAISS vector store.")
+    parser.add_argument("command", choices=["info", "rebuild"])
+    parser.add_argument("--persist-dir", default="vector_db/faiss_store")
+    parser.add_argument("--index-type", choices=faiss_index.INDEX_TYPES)
+    parser.add_argument("--quantization", choices=["none", "sq8", "pq"])
+    args = parser.parse_args()
+    store = VectorStore(persist_dir=args.persist_dir, mmap=args.command == "info")
+    store.load()
+    if args.command == "rebuild":
+        quant = store.meta.get("quantization", store.quantization) if args.quantization is None else args.quantization
+        quant = None if quant == "none" else quant
+        print(json.dumps(store.rebuild(args.index_type or store.meta.get("index_type"), quant), indent=2))
+    else:
+        print(json.dumps(store.info(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
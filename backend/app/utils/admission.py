@@ -0,0 +1,89 @@
+import asyncio, os, time, functools, logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Optional, TypeVar
+from fastapi import HTTPException
+from app.utils.metrics import admission_outcomes
+
+logger=logging.getLogger(__name__)
+T=TypeVar("T")
+
+# Shared bounded pool for synchronous CPU work called from async handlers (index scoring, regex validation).
+cpu_executor=ThreadPoolExecutor(max_workers=int(os.getenv("CPU_THREADS", "0")) or min(8, (os.cpu_count() or 1)+2), thread_name_prefix="cpu")
+
+class _Slot:
+    """A Limiter slot taken by run_async(): released once the coroutine and every pool thread it started are done."""
+    def __init__(self, release: Callable[[], None]):
+        self.pending=1; self._release=release; self._loop=asyncio.get_running_loop()
+
+    def hold(self, fut: Future):
+        self.pending+=1
+        fut.add_done_callback(self._finished)
+
+    def _finished(self, _: Future):   # runs on the pool thread
+        try: self._loop.call_soon_threadsafe(self.done)
+        except RuntimeError: pass   # the loop was closed at shutdown before the thread finished; there is no one left to admit
+
+    def done(self):
+        self.pending-=1
+        if not self.pending: self._release()
+
+_slot: ContextVar[Optional[_Slot]]=ContextVar("admission_slot", default=None)
+
+def to_cpu(fn: Callable[..., T], *args, **kwargs)->"asyncio.Future[T]":
+    """Start fn on the CPU pool. Under Limiter.run_async the caller's slot stays taken until the thread finishes,
+    even if the awaiting coroutine is cancelled or times out first."""
+    fut=cpu_executor.submit(functools.partial(fn, *args, **kwargs))
+    slot=_slot.get()
+    if slot is not None: slot.hold(fut)
+    return asyncio.wrap_future(fut)
+
+async def offload(fn: Callable[..., T], *args, **kwargs)->T:
+    return await to_cpu(fn, *args, **kwargs)
+
+class Limiter:
+    """
+    Per-endpoint admission control: at most `concurrency` calls run at once, at most `queue`
+    wait for a slot (beyond that callers get an immediate 503), and each call has a deadline
+    covering both queueing and execution (504 when exceeded).
+    """
+    def __init__(self, name: str, concurrency: int, queue: int, timeout: float):
+        self.name=name; self.concurrency=concurrency; self.queue=queue; self.timeout=timeout
+        self._sem: Optional[asyncio.Semaphore]=None
+        self.waiting=0; self.running=0
+
+    def _overloaded(self):
+        admission_outcomes.inc(limiter=self.name, outcome="rejected")
+        raise HTTPException(503, f"{self.name} is busy, retry shortly", headers={"Retry-After":"1"})
+
+    async def _acquire(self, deadline: float):
+        if self._sem is None: self._sem=asyncio.Semaphore(self.concurrency)
+        # counters change synchronously, so callers arriving in the same loop tick see each other's reservations
+        if self.running+self.waiting>=self.concurrency+self.queue: self._overloaded()
+        self.waiting+=1
+        try: await asyncio.wait_for(self._sem.acquire(), max(0.0, deadline-time.monotonic()))
+        except asyncio.TimeoutError: self._overloaded()
+        finally: self.waiting-=1
+        self.running+=1
+
+    def _release(self):
+        self.running-=1; self._sem.release()
+
+    async def run_async(self, coro: Awaitable[T])->T:
+        """Run a coroutine under this limiter; work it starts with to_cpu()/offload() keeps the slot until it finishes."""
+        deadline=time.monotonic()+self.timeout
+        try: await self._acquire(deadline)
+        except HTTPException:
+            if asyncio.iscoroutine(coro): coro.close()
+            raise
+        slot=_Slot(self._release); token=_slot.set(slot)   # copied into the task wait_for creates
+        try: return await asyncio.wait_for(coro, max(0.0, deadline-time.monotonic()))
+        except asyncio.TimeoutError: self._timeout()
+        finally: _slot.reset(token); slot.done()
+
+    def _timeout(self):
+        admission_outcomes.inc(limiter=self.name, outcome="timeout")
+        raise HTTPException(504, f"{self.name} timed out after {self.timeout:.1f}s")
+
+rag_limiter=Limiter("RAG chat", int(os.getenv("RAG_CONCURRENCY", "4")), int(os.getenv("RAG_QUEUE", "32")), float(os.getenv("RAG_TIMEOUT_S", "10")))
+flow_limiter=Limiter("Flow chat", int(os.getenv("FLOW_CONCURRENCY", "64")), int(os.getenv("FLOW_QUEUE", "512")), float(os.getenv("FLOW_TIMEOUT_S", "5")))
@@ -0,0 +1,105 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from contextlib import contextmanager
+import bisect, threading, time
+
+# Minimal in-process metrics registry rendered in the Prometheus text exposition format.
+# Counters and histograms are per worker process; scrape each worker (or aggregate upstream).
+
+DEFAULT_BUCKETS=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _esc(v: str)->str: return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Tuple[str,...], values: Tuple[str,...], extra: str="")->str:
+    parts=[f'{n}="{_esc(v)}"' for n, v in zip(names, values)]
+    if extra: parts.append(extra)
+    return "{"+",".join(parts)+"}" if parts else ""
+
+class _Metric:
+    kind=""
+    def __init__(self, name: str, help: str, labelnames: Iterable[str]=()):
+        self.name=name; self.help=help; self.labelnames=tuple(labelnames)
+        self._lock=threading.Lock()
+    def _key(self, labels: Dict[str,str])->Tuple[str,...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+    def header(self)->List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind="counter"
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw); self._values: Dict[Tuple[str,...], float]={}
+    def inc(self, amount: float=1.0, **labels):
+        k=self._key(labels)
+        with self._lock: self._values[k]=self._values.get(k, 0.0)+amount
+    def render(self)->List[str]:
+        with self._lock: items=list(self._values.items())
+        return self.header()+[f"{self.name}{_labels(self.labelnames, k)} {v:g}" for k, v in items]
+
+class Gauge(_Metric):
+    kind="gauge"
+    def __init__(self, *a, fn: Optional[Callable[[], float]]=None, **kw):
+        super().__init__(*a, **kw); self._values: Dict[Tuple[str,...], float]={}; self.fn=fn
+    def set(self, value: float, **labels):
+        with self._lock: self._values[self._key(labels)]=value
+    def render(self)->List[str]:
+        if self.fn is not None:
+            try: self.set(float(self.fn()))
+            except Exception: pass
+        with self._lock: items=list(self._values.items())
+        return self.header()+[f"{self.name}{_labels(self.labelnames, k)} {v:g}" for k, v in items]
+
+class Histogram(_Metric):
+    kind="histogram"
+    def __init__(self, *a, buckets: Iterable[float]=DEFAULT_BUCKETS, **kw):
+        super().__init__(*a, **kw); self.buckets=tuple(sorted(buckets))
+        self._values: Dict[Tuple[str,...], List[float]]={}   # per bucket counts (+Inf last), then sum
+    def observe(self, value: float, **labels):
+        k=self._key(labels); i=bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            v=self._values.get(k)
+            if v is None: v=self._values[k]=[0.0]*(len(self.buckets)+2)
+            v[i]+=1; v[-1]+=value
+    @contextmanager
+    def time(self, **labels):
+        t0=time.perf_counter()
+        try: yield
+        finally: self.observe(time.perf_counter()-t0, **labels)
+    def render(self)->List[str]:
+        with self._lock: items=[(k, list(v)) for k, v in self._values.items()]
+        out=self.header()
+        for k, v in items:
+            acc=0.0
+            for b, n in zip(self.buckets+(float("inf"),), v[:-1]):
+                acc+=n; le="+Inf" if b==float("inf") else f"{b:g}"
+                le_label='le="'+le+'"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, k, le_label)} {acc:g}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, k)} {v[-1]:g}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, k)} {acc:g}")
+        return out
+
+class Registry:
+    def __init__(self): self._metrics: Dict[str,_Metric]={}; self._lock=threading.Lock()
+    def _add(self, m: _Metric)->_Metric:
+        with self._lock: return self._metrics.setdefault(m.name, m)
+    def counter(self, name: str, help: str, labelnames: Iterable[str]=())->Counter: return self._add(Counter(name, help, labelnames))
+    def gauge(self, name: str, help: str, labelnames: Iterable[str]=(), fn: Optional[Callable[[], float]]=None)->Gauge: return self._add(Gauge(name, help, labelnames, fn=fn))
+    def histogram(self, name: str, help: str, labelnames: Iterable[str]=(), buckets: Iterable[float]=DEFAULT_BUCKETS)->Histogram: return self._add(Histogram(name, help, labelnames, buckets=buckets))
+    def render(self)->str:
+        with self._lock: metrics=list(self._metrics.values())
+        return "\n".join(line for m in metrics for line in m.render())+"\n"
+
+registry=Registry()
+
+http_requests=registry.counter("http_requests_total", "HTTP requests by route and status", ("method","route","status"))
+http_latency=registry.histogram("http_request_duration_seconds", "HTTP request latency by route", ("method","route"))
+ingest_stage=registry.histogram("rag_ingest_stage_seconds", "Time per file spent in each ingestion stage", ("stage",), buckets=(0.001,0.01,0.05,0.1,0.5,1,2.5,5,10,30,60,120,300))
+ingest_files=registry.counter("rag_ingest_files_total", "Ingested files by outcome", ("status",))
+ingest_chunks=registry.counter("rag_ingest_chunks_total", "Chunks indexed")
+rag_query=registry.histogram("rag_query_seconds", "Keyword index scoring time per uncached query")
+rag_retriever=registry.histogram("rag_retriever_seconds", "Time per retriever inside a chat query", ("retriever",))
+rag_retriever_outcomes=registry.counter("rag_retriever_outcomes_total", "Retriever results by outcome (ok, timeout, error)", ("retriever","outcome"))
+rag_query_cache=registry.counter("rag_query_cache_total", "Query cache lookups from the chat path", ("result",))
+admission_outcomes=registry.counter("admission_outcomes_total", "Chat requests turned away by a limiter (rejected: queue full, timeout: deadline passed)", ("limiter","outcome"))
+lead_sink_dropped=registry.counter("lead_sink_dropped_total", "Completed flow summaries dropped after the lead sink ran out of write retries")
+flow_transitions=registry.counter("flow_step_transitions_total", "Flow step transitions", ("from_step","to_step"))
+flow_validation_failures=registry.counter("flow_validation_failures_total", "Rejected flow inputs by step", ("step",))
@@ -0,0 +1,38 @@
+from fastapi import Request
+from fastapi.responses import PlainTextResponse
+import io, os, pstats, cProfile, logging
+
+logger=logging.getLogger(__name__)
+
+# Opt-in per-request profiler: with PROFILING_ENABLED=1, a request carrying "X-Profile: 1" is run
+# under pyinstrument (if installed) or cProfile, and the report replaces the normal response body.
+PROFILING_ENABLED=os.getenv("PROFILING_ENABLED", "0").lower() in ("1","true","yes")
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler=None
+
+def requested(request: Request)->bool:
+    return PROFILING_ENABLED and request.headers.get("x-profile")=="1"
+
+async def _drain(response):
+    body=getattr(response, "body_iterator", None)
+    if body is not None:
+        async for _ in body: pass
+
+async def profile_request(request: Request, call_next)->PlainTextResponse:
+    if Profiler is not None:
+        p=Profiler(async_mode="enabled"); p.start()
+        try: response=await call_next(request); await _drain(response)
+        finally: p.stop()
+        report=p.output_text(unicode=True, color=False); engine="pyinstrument"
+    else:
+        # cProfile only sees the thread it runs on, so work offloaded to pools shows up as waits
+        p=cProfile.Profile(); p.enable()
+        try: response=await call_next(request); await _drain(response)
+        finally: p.disable()
+        out=io.StringIO(); pstats.Stats(p, stream=out).sort_stats("cumulative").print_stats(40)
+        report=out.getvalue(); engine="cProfile"
+    logger.info(f"Profiled {request.method} {request.url.path} with {engine}")
+    return PlainTextResponse(report, headers={"X-Profile-Engine":engine, "X-Profiled-Status":str(response.status_code)})
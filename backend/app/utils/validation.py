@@ -1,9 +1,15 @@
 import re
 from typing import Dict, Any
 
+# Compiled once at import; these run per chat turn and per row of bulk lead imports.
+TAG_RE=re.compile(r'<[^>]+>')
+NAME_RE=re.compile(r"[a-zA-Z\s\-']{2,50}")
+EMAIL_RE=re.compile(r"^[a-zA-Z0-9.!#$%&'*+/=?^_`{|}~-]+@[a-zA-Z0-9-]+(?:\.[a-zA-Z0-9-]+)+$")
+NON_DIGIT_RE=re.compile(r'\D')
+
 def sanitize_input(text: str) -> str:
     if not text: return ""
-    text = re.sub(r'<[^>]+>', '', text)
+    text = TAG_RE.sub('', text)
     return ' '.join(text.split()).strip()
 
 class ValidationUtils:
@@ -13,7 +19,7 @@ class ValidationUtils:
         if not name: res['message']='Name is required'; return res
         name=name.strip()
         if len(name)<2: res['message']='Name must be at least 2 characters'; return res
-        if not re.fullmatch(r"[a-zA-Z\s\-']{2,50}", name): res['message']='Only letters, spaces, hyphens, apostrophes allowed'; return res
+        if not NAME_RE.fullmatch(name): res['message']='Only letters, spaces, hyphens, apostrophes allowed'; return res
         res['is_valid']=True; res['normalized_name']=' '.join(w.capitalize() for w in name.split()); res['message']='OK'; return res
 
     @staticmethod
@@ -21,15 +27,14 @@ class ValidationUtils:
         res={'is_valid': False, 'message':'', 'normalized_email': None}
         if not email: res['message']='Email is required'; return res
         email=email.strip().lower()
-        pat=r"^[a-zA-Z0-9.!#$%&'*+/=?^_`{|}~-]+@[a-zA-Z0-9-]+(?:\.[a-zA-Z0-9-]+)+$"
-        if not re.fullmatch(pat, email): res['message']='Invalid email format'; return res
+        if not EMAIL_RE.fullmatch(email): res['message']='Invalid email format'; return res
         res['is_valid']=True; res['normalized_email']=email; res['message']='OK'; return res
 
     @staticmethod
     def validate_phone(phone: str) -> Dict[str, Any]:
         res={'is_valid': False, 'message':'', 'formatted_phone': None}
         if not phone: res['message']='Phone number is required'; return res
-        num=re.sub(r'\D','', phone)
+        num=NON_DIGIT_RE.sub('', phone)
         if len(num)==10 and num[0] in '6789':
             res['is_valid']=True; res['formatted_phone']=f"+91 {num[:5]} {num[5:]}"; res['message']='OK'
         elif len(num)==12 and num.startswith('91') and num[2] in '6789':
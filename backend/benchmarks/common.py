@@ -0,0 +1,56 @@
+"""Timing helpers shared by the benchmark modules."""
+import gc
+import math
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+
+def percentiles(samples_s: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean in milliseconds for a list of durations in seconds."""
+    if not samples_s:
+        return {"count": 0}
+    xs = sorted(samples_s)
+
+    def pct(p: float) -> float:
+        return xs[min(len(xs) - 1, max(0, math.ceil(p * len(xs)) - 1))] * 1000
+
+    return {
+        "count": len(xs),
+        "mean_ms": round(statistics.fmean(xs) * 1000, 4),
+        "p50_ms": round(pct(0.50), 4),
+        "p95_ms": round(pct(0.95), 4),
+        "p99_ms": round(pct(0.99), 4),
+    }
+
+
+def bench(fn: Callable[[], Any], repeat: int = 200, warmup: int = 5) -> Dict[str, float]:
+    """Call `fn` `repeat` times and report latency percentiles plus ops/s."""
+    for _ in range(warmup):
+        fn()
+    gc.collect()
+    samples = []
+    t_all = time.perf_counter()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    total = time.perf_counter() - t_all
+    return {**percentiles(samples), "ops_per_s": round(repeat / total, 1)}
+
+
+_scratch = None
+
+
+def use_scratch_dir() -> str:
+    """
+    chdir into a temporary directory (once per process) before the app is imported, so the
+    services' relative data/ and vector_db/ paths never touch the real working tree.
+    """
+    global _scratch
+    if _scratch is None:
+        _scratch = tempfile.mkdtemp(prefix="bench-")
+        os.chdir(_scratch)
+    return _scratch
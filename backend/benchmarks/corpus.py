@@ -0,0 +1,80 @@
+"""
+Deterministic synthetic corpus for benchmarks.
+
+Chunks are built from a Zipf-distributed vocabulary with some healthcare terms, so
+posting-list lengths look like real documents (a few very common tokens, a long tail).
+
+    cd backend && python -m benchmarks.corpus --chunks 100000 --out /tmp/corpus
+"""
+import argparse
+import itertools
+import os
+import random
+from typing import Iterator, List, Tuple
+
+DOMAIN = ("visiting hours insurance accepted cardiology appointment emergency pharmacy billing "
+          "discharge outpatient radiology pediatrics consultation admission surgery laboratory "
+          "vaccination physiotherapy dermatology orthopedics neurology maternity ward parking").split()
+
+QUERIES = [
+    "visiting hours", "insurance accepted", "emergency contact number", "cardiology appointment",
+    "pharmacy timings", "billing department", "discharge process", "pediatrics ward visiting",
+    "parking near radiology", "vaccination schedule for children",
+]
+
+
+def vocabulary(size: int = 20000, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set(DOMAIN)
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    out = sorted(words - set(DOMAIN))
+    rng.shuffle(out)
+    return DOMAIN + out
+
+
+def iter_chunks(n: int, chunk_chars: int = 900, seed: int = 0, vocab_size: int = 20000) -> Iterator[Tuple[str, str]]:
+    """Yield (key, text) pairs, ~`chunk_chars` characters each, 50 chunks per synthetic file."""
+    rng = random.Random(seed)
+    vocab = vocabulary(vocab_size)
+    cum_weights = list(itertools.accumulate(1.0 / (i + 1) for i in range(len(vocab))))
+    for i in range(n):
+        words: List[str] = []
+        size = 0
+        while size < chunk_chars:
+            sentence = rng.choices(vocab, cum_weights=cum_weights, k=rng.randint(6, 18))
+            s = " ".join(sentence).capitalize() + "."
+            words.append(s)
+            size += len(s) + 1
+        yield f"doc_{i // 50:06d}.txt::chunk_{i % 50}", " ".join(words)[:chunk_chars]
+
+
+def write_corpus(n: int, out_dir: str, chunks_per_file: int = 50, seed: int = 0) -> List[str]:
+    """Write the corpus as .txt files (one per `chunks_per_file` chunks) and return their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths: List[str] = []
+    fh = None
+    for i, (_, text) in enumerate(iter_chunks(n, seed=seed)):
+        if i % chunks_per_file == 0:
+            if fh:
+                fh.close()
+            paths.append(os.path.join(out_dir, f"doc_{i // chunks_per_file:06d}.txt"))
+            fh = open(paths[-1], "w", encoding="utf-8")
+        fh.write(text + "\n\n")
+    if fh:
+        fh.close()
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+    paths = write_corpus(args.chunks, args.out)
+    print(f"Wrote {args.chunks} chunks in {len(paths)} files to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
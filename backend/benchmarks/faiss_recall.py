@@ -0,0 +1,79 @@
+"""
+Recall / latency / memory trade-off of the FAISS index types supported by VectorStore.
+
+    cd backend && python -m benchmarks.faiss_recall --n 200000 --configs flat,ivf,ivf+pq,hnsw,hnsw+sq8
+
+Ground truth is an exact flat search over the same synthetic (clustered) vectors.
+"""
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+
+import faiss
+import numpy as np
+
+from app.services import faiss_index
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    x = centers[rng.integers(0, clusters, n)] + 0.35 * rng.normal(size=(n, dim)).astype(np.float32)
+    faiss.normalize_L2(x)
+    return x
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+def run(n: int, dim: int, queries: int, k: int, configs: List[str], nprobe: int, ef_search: int) -> Dict[str, Any]:
+    data = synthetic_vectors(n + queries, dim)
+    xb, xq = data[:n], data[n:]
+    exact = faiss_index.build_index(xb, "Flat")
+    _, truth = exact.search(xq, k)
+    results = []
+    for cfg in configs:
+        index_type, _, quant = cfg.partition("+")
+        spec = faiss_index.index_spec(index_type, quant or None, n=n, dim=dim)
+        t0 = time.perf_counter()
+        index = faiss_index.build_index(xb, spec)
+        build_s = time.perf_counter() - t0
+        faiss_index.tune(index, nprobe=nprobe or faiss_index.default_nprobe(index), ef_search=ef_search)
+        t0 = time.perf_counter()
+        _, found = index.search(xq, k)
+        search_s = time.perf_counter() - t0
+        results.append({
+            "config": cfg,
+            "spec": spec,
+            "build_s": round(build_s, 3),
+            "qps": round(queries / search_s, 1),
+            "latency_ms": round(1000 * search_s / queries, 4),
+            f"recall@{k}": round(recall_at_k(found, truth), 4),
+            "index_bytes": int(faiss.serialize_index(index).size),
+        })
+        print(json.dumps(results[-1]))
+    return {"n": n, "dim": dim, "queries": queries, "k": k, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--configs", default="flat,ivf,ivf+sq8,ivf+pq,hnsw,hnsw+sq8")
+    parser.add_argument("--nprobe", type=int, default=0, help="IVF nprobe (default sqrt(nlist))")
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+    report = run(args.n, args.dim, args.queries, args.k, args.configs.split(","), args.nprobe, args.ef_search)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
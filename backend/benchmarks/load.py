@@ -0,0 +1,100 @@
+"""
+In-process ASGI load driver for the /flow/* and /rag/* endpoints (no network, no server).
+
+    cd backend && python -m benchmarks.load --scenario flow,rag --concurrency 32 --duration 10 --rag-chunks 10000
+
+The app is imported inside a scratch working directory so the benchmark never touches
+the real data/ or vector_db/ folders. Requires httpx (benchmarks/requirements.txt).
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from benchmarks.common import percentiles, use_scratch_dir
+from benchmarks.corpus import QUERIES, iter_chunks
+
+FLOW_TURNS = ["Jane Roe", "jane.roe@example.com", "9876543210", "support"]
+
+
+async def _worker(client, scenario: str, stop_at: float, samples: Dict[str, List[float]], status: Counter, rng: random.Random, unique: bool):
+    while time.perf_counter() < stop_at:
+        if scenario == "flow":
+            t0 = time.perf_counter()
+            r = await client.post("/flow/start")
+            samples["POST /flow/start"].append(time.perf_counter() - t0)
+            status[r.status_code] += 1
+            if r.status_code != 200:
+                continue
+            sid = r.json()["session_id"]
+            for msg in FLOW_TURNS:
+                t0 = time.perf_counter()
+                r = await client.post(f"/flow/chat/{sid}", json={"message": msg})
+                samples["POST /flow/chat/{id}"].append(time.perf_counter() - t0)
+                status[r.status_code] += 1
+        else:
+            q = rng.choice(QUERIES) + (f" {rng.random()}" if unique else "")
+            t0 = time.perf_counter()
+            r = await client.post("/rag/chat/bench", json={"message": q})
+            samples["POST /rag/chat/{id}"].append(time.perf_counter() - t0)
+            status[r.status_code] += 1
+
+
+async def run_scenario(app, scenario: str, concurrency: int, duration: float, unique: bool) -> Dict[str, Any]:
+    import httpx
+    samples: Dict[str, List[float]] = {}
+    for k in ("POST /flow/start", "POST /flow/chat/{id}", "POST /rag/chat/{id}"):
+        samples[k] = []
+    status: Counter = Counter()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        t0 = time.perf_counter()
+        stop_at = t0 + duration
+        await asyncio.gather(*(_worker(client, scenario, stop_at, samples, status, random.Random(i), unique) for i in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+    total = sum(status.values())
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 1),
+        "status": {str(k): v for k, v in sorted(status.items())},
+        "endpoints": {k: percentiles(v) for k, v in samples.items() if v},
+    }
+
+
+def run(scenarios: List[str], concurrency: int, duration: float, rag_chunks: int, unique: bool) -> Dict[str, Any]:
+    workdir = use_scratch_dir()
+    from app.main import app
+    from app.services.rag_service import rag_service
+    if "rag" in scenarios and rag_chunks:
+        by_file: Dict[str, List[str]] = {}
+        for key, text in iter_chunks(rag_chunks):
+            by_file.setdefault(key.split("::")[0], []).append(text)
+        for name, chunks in by_file.items():
+            rag_service.add_chunks(name, chunks)
+    out: Dict[str, Any] = {"workdir": workdir}
+    for scenario in scenarios:
+        out[scenario] = asyncio.run(run_scenario(app, scenario, concurrency, duration, unique))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", default="flow,rag")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--rag-chunks", type=int, default=10000)
+    parser.add_argument("--unique-queries", action="store_true", help="append a random suffix so the query cache never hits")
+    args = parser.parse_args()
+    report = run(args.scenario.split(","), args.concurrency, args.duration, args.rag_chunks, args.unique_queries)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
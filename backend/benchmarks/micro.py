@@ -0,0 +1,118 @@
+"""
+Micro-benchmarks for the hot paths: chunking, keyword query, query cache, flow validation,
+and (when the optional langchain/FAISS stack is installed) VectorStore.similarity_search.
+
+    cd backend && python -m benchmarks.micro --sizes 1000,10000,100000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.common import bench, percentiles, use_scratch_dir
+from benchmarks.corpus import QUERIES, iter_chunks
+
+use_scratch_dir()  # before importing app modules: some open their stores at import time
+
+from app.services.extraction import chunk_sentences, iter_sentences, normalize  # noqa: E402
+from app.services.rag_service import InvertedIndex  # noqa: E402
+from app.services.query_cache import QueryCache  # noqa: E402
+from app.utils.validation import ValidationUtils, sanitize_input  # noqa: E402
+
+
+def bench_chunking(chars: int = 2_000_000) -> Dict[str, Any]:
+    text = " ".join(t for _, t in iter_chunks(max(1, chars // 900)))
+    pages = [text[i:i + 4000] for i in range(0, len(text), 4000)]
+    t0 = time.perf_counter()
+    n = sum(1 for _ in chunk_sentences(iter_sentences(normalize(pages))))
+    dt = time.perf_counter() - t0
+    return {"chars": len(text), "chunks": n, "seconds": round(dt, 4), "mb_per_s": round(len(text) / dt / 1e6, 2)}
+
+
+def bench_index(n: int, queries: int = 300) -> Dict[str, Any]:
+    index = InvertedIndex()
+    t0 = time.perf_counter()
+    for key, text in iter_chunks(n):
+        index.add(key, text)
+    build_s = time.perf_counter() - t0
+    rng = random.Random(1)
+    samples = []
+    for _ in range(queries):
+        q = rng.choice(QUERIES)
+        t = time.perf_counter()
+        index.search(q, 3)
+        samples.append(time.perf_counter() - t)
+    return {"chunks": n, "tokens": len(index.postings), "build_s": round(build_s, 3),
+            "build_chunks_per_s": round(n / build_s, 1), "query": percentiles(samples)}
+
+
+def bench_cache() -> Dict[str, Any]:
+    cache = QueryCache(max_entries=1024)
+    key = QueryCache.key("bench", 0, "Visiting hours?", 3)
+    cache.put(key, "x" * 600)
+    return {"hit": bench(lambda: cache.get(QueryCache.key("bench", 0, "visiting  HOURS", 3)), repeat=20000)}
+
+
+def bench_validation() -> Dict[str, Any]:
+    options = ["consulting", "development", "support", "training", "maintenance"]
+
+    def turn():
+        ValidationUtils.validate_name(sanitize_input("  Jane   O'Neil "))
+        ValidationUtils.validate_email(sanitize_input("Jane.ONeil@Example.com"))
+        ValidationUtils.validate_phone(sanitize_input("+91 98765-43210"))
+        ValidationUtils.validate_service_selection(sanitize_input("Support"), options)
+
+    return {"four_field_turn": bench(turn, repeat=20000)}
+
+
+def bench_vector(n: int, queries: int = 100) -> Dict[str, Any]:
+    try:
+        from app.services.vector_store import VectorStore
+    except ImportError as e:
+        return {"skipped": f"vector store dependencies missing: {e}"}
+    from benchmarks.corpus import write_corpus
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_corpus(n, os.path.join(tmp, "docs"))
+        store = VectorStore(persist_dir=os.path.join(tmp, "faiss"))
+        t0 = time.perf_counter()
+        store.add_files(paths)
+        ingest_s = time.perf_counter() - t0
+        rng = random.Random(2)
+        samples = []
+        for i in range(queries):
+            q = f"{rng.choice(QUERIES)} {i}"  # unique text, so the embedding is computed every time
+            t = time.perf_counter()
+            store.similarity_search(q, 5)
+            samples.append(time.perf_counter() - t)
+        info = store.info()
+        store.close()  # flush the pending snapshot while the scratch directory still exists
+        return {"chunks": n, "ingest_s": round(ingest_s, 3), "query": percentiles(samples), "info": info}
+
+
+def run(sizes: List[int], vector_sizes: List[int]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {
+        "chunking": bench_chunking(),
+        "validation": bench_validation(),
+        "query_cache": bench_cache(),
+        "keyword_index": {str(n): bench_index(n) for n in sizes},
+    }
+    if vector_sizes:
+        out["vector_store"] = {str(n): bench_vector(n) for n in vector_sizes}
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="keyword index sizes in chunks (up to 1000000)")
+    parser.add_argument("--vector-sizes", default="", help="VectorStore sizes in chunks; needs langchain + faiss + a model")
+    args = parser.parse_args()
+    sizes = [int(x) for x in args.sizes.split(",") if x]
+    vector_sizes = [int(x) for x in args.vector_sizes.split(",") if x]
+    print(json.dumps(run(sizes, vector_sizes), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Run the benchmark suites, write a JSON report and optionally compare it with a saved baseline.
+
+    cd backend
+    python -m benchmarks.run --suites micro,load --out bench/current.json
+    python -m benchmarks.run --suites micro,load --out bench/new.json --baseline bench/current.json --tolerance 0.10
+
+Metrics ending in _ms / _s are lower-is-better; *_per_s, *_rps and recall@k are higher-is-better. Changes worse than --tolerance are listed as regressions (exit code 1 with --fail-on-regression).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.common import use_scratch_dir
+
+
+def flatten(d: Any, prefix: str = "") -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    if isinstance(d, dict):
+        for k, v in d.items():
+            out.update(flatten(v, f"{prefix}{k}."))
+    elif isinstance(d, list):
+        for i, v in enumerate(d):
+            key = v.get("config", i) if isinstance(v, dict) else i
+            out.update(flatten(v, f"{prefix}{key}."))
+    elif isinstance(d, (int, float)) and not isinstance(d, bool):
+        out[prefix[:-1]] = float(d)
+    return out
+
+
+def direction(metric: str) -> Optional[int]:
+    """+1 if higher is better, -1 if lower is better, None if the metric is informational."""
+    name = metric.rsplit(".", 1)[-1]
+    if name.endswith(("_per_s", "_rps")) or name.startswith("recall@") or name == "mb_per_s":
+        return 1
+    if name.endswith(("_ms", "_s")) and name != "duration_s":
+        return -1
+    return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    cur, base = flatten(current), flatten(baseline)
+    regressions, improvements = [], []
+    for metric, new in sorted(cur.items()):
+        sign = direction(metric)
+        old = base.get(metric)
+        if sign is None or old is None or old == 0:
+            continue
+        change = (new - old) / abs(old) * sign
+        row = {"metric": metric, "baseline": old, "current": new, "change": round(change, 4)}
+        if change < -tolerance:
+            regressions.append(row)
+        elif change > tolerance:
+            improvements.append(row)
+    return regressions, improvements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", default="micro,load", help="any of micro, load, faiss")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="keyword index sizes (micro)")
+    parser.add_argument("--vector-sizes", default="", help="VectorStore sizes (micro; optional deps)")
+    parser.add_argument("--concurrency", type=int, default=16, help="load")
+    parser.add_argument("--duration", type=float, default=10.0, help="load, seconds per scenario")
+    parser.add_argument("--rag-chunks", type=int, default=10000, help="load")
+    parser.add_argument("--faiss-n", type=int, default=100000, help="faiss")
+    parser.add_argument("--out", default="bench/results.json")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    suites = [s for s in args.suites.split(",") if s]
+    report: Dict[str, Any] = {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(), "args": vars(args)},
+    }
+    out_path = os.path.abspath(args.out)
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    report["meta"]["workdir"] = use_scratch_dir()
+    if "micro" in suites:
+        from benchmarks import micro
+        report["micro"] = micro.run([int(x) for x in args.sizes.split(",") if x],
+                                    [int(x) for x in args.vector_sizes.split(",") if x])
+    if "faiss" in suites:
+        from benchmarks import faiss_recall
+        report["faiss"] = faiss_recall.run(args.faiss_n, 384, 500, 10, ["flat", "ivf", "ivf+sq8", "hnsw", "hnsw+sq8"], 0, 64)
+    if "load" in suites:
+        from benchmarks import load
+        report["load"] = load.run(["flow", "rag"], args.concurrency, args.duration, args.rag_chunks, unique=True)
+
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions, improvements = compare({k: v for k, v in report.items() if k != "meta"},
+                                            {k: v for k, v in baseline.items() if k != "meta"}, args.tolerance)
+        report["comparison"] = {"baseline": baseline_path, "tolerance": args.tolerance,
+                                "regressions": regressions, "improvements": improvements}
+        for r in regressions:
+            print(f"REGRESSION {r['metric']}: {r['baseline']} -> {r['current']} ({r['change']:+.1%})", file=sys.stderr)
+
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {out_path}")
+    if args.fail_on_regression and report.get("comparison", {}).get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
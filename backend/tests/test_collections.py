@@ -0,0 +1,28 @@
+import threading
+import pytest
+from app.services.rag_service import CollectionManager
+from app.services.segment_store import SegmentStore
+
+def test_second_open_in_the_same_process_is_refused(tmp_path):
+    store=SegmentStore(str(tmp_path/"store"))
+    with pytest.raises(RuntimeError, match="already open in this process"): SegmentStore(str(tmp_path/"store"), shared=True)
+    store.close()
+    SegmentStore(str(tmp_path/"store")).close()
+
+def test_use_waits_for_an_evicted_collection_to_close(tmp_path):
+    manager=CollectionManager(root=str(tmp_path), idle_s=0, sweep_interval=0)
+    manager.add_chunks("a.txt", ["alpha beta"], collection="c1")
+    errors=[]; stop=threading.Event()
+    def query():
+        while not stop.is_set():
+            try: manager.search("alpha", collection="c1")
+            except Exception as e: errors.append(e)
+    def sweep():
+        while not stop.is_set(): manager.sweep()
+    threads=[threading.Thread(target=query) for _ in range(3)]+[threading.Thread(target=sweep)]
+    for t in threads: t.start()
+    stop.wait(1.0); stop.set()
+    for t in threads: t.join()
+    assert not errors, errors[:3]
+    assert manager.evicted and manager.search("alpha", collection="c1")[0]["document"]=="a.txt"
+    manager.close()
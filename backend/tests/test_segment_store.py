@@ -0,0 +1,133 @@
+import os, threading, multiprocessing
+import pytest
+from app.services.segment_store import SegmentStore, FRAME, BASE
+
+def _writer(path, conn, segment_bytes):
+    """Child process owning the store; runs ("put", items) / ("compact",) / ("close",) commands from the pipe."""
+    store=SegmentStore(path, segment_bytes=segment_bytes, compact_segments=1000)
+    conn.send(os.getpid())
+    while True:
+        cmd, *args=conn.recv()
+        if cmd=="put": store.put_many(args[0])
+        elif cmd=="delete": store.delete_many(args[0])
+        elif cmd=="compact": store.compact()
+        elif cmd=="close": store.close(); conn.send("closed"); return
+        conn.send("ok")
+
+class Writer:
+    def __init__(self, path, segment_bytes=64<<20):
+        self.conn, child=multiprocessing.get_context("fork").Pipe()
+        self.proc=multiprocessing.get_context("fork").Process(target=_writer, args=(path, child, segment_bytes), daemon=True)
+        self.proc.start(); self.pid=self.conn.recv()
+    def __call__(self, *cmd):
+        self.conn.send(cmd); return self.conn.recv()
+    def close(self):
+        if self.proc.is_alive(): self("close")
+        self.proc.join(5)
+
+@pytest.fixture
+def writer(tmp_path):
+    started=[]
+    def start(**kw):
+        w=Writer(str(tmp_path/"store"), **kw); started.append(w); return w
+    yield start
+    for w in started: w.close()
+
+def test_torn_tail_frame_is_dropped_on_reopen(tmp_path):
+    path=str(tmp_path/"store")
+    store=SegmentStore(path)
+    store.put_many([("a", "one"), ("b", "two")])
+    store.put_many([("c", "three")])
+    seg=store._file(store._active_id); good=os.path.getsize(seg)
+    store.close()
+    with open(seg, "ab") as f: f.write(FRAME.pack(100, 0)+b"\x01partial")   # crash in the middle of a frame
+    store=SegmentStore(path)
+    assert dict(store)=={"a":"one", "b":"two", "c":"three"}
+    assert os.path.getsize(seg)==good
+    store.put_many([("d", "four")])
+    store.close()
+    store=SegmentStore(path)
+    assert dict(store)=={"a":"one", "b":"two", "c":"three", "d":"four"}
+    store.close()
+
+def test_corrupt_frame_drops_it_and_everything_after(tmp_path):
+    path=str(tmp_path/"store")
+    store=SegmentStore(path)
+    store.put_many([("a", "one")]); good=store._fh.tell()
+    store.put_many([("b", "two")]); store.put_many([("c", "three")])
+    seg=store._file(store._active_id); store.close()
+    with open(seg, "r+b") as f: f.seek(good+FRAME.size+4); f.write(b"\xff")   # flip a byte inside the second frame
+    store=SegmentStore(path)
+    assert dict(store)=={"a":"one"}
+    store.close()
+
+def test_second_writer_is_refused(tmp_path, writer):
+    w=writer()
+    with pytest.raises(RuntimeError, match=f"pid {w.pid}"): SegmentStore(str(tmp_path/"store"))
+
+def test_shared_open_is_read_only(tmp_path, writer):
+    w=writer(); w("put", [("a", "one")])
+    store=SegmentStore(str(tmp_path/"store"), shared=True)
+    assert store.readonly and store.owner==str(w.pid)
+    assert dict(store)=={"a":"one"}
+    with pytest.raises(RuntimeError, match="read-only"): store.put_many([("b", "two")])
+    store.close()
+
+def test_reader_follows_writer(tmp_path, writer):
+    w=writer(); w("put", [("a", "one"), ("b", "two")])
+    store=SegmentStore(str(tmp_path/"store"), shared=True)
+    assert store.refresh()=={}
+    w("put", [("a", "uno"), ("c", "three")]); w("delete", ["b"])
+    assert store.refresh()=={"a":"one", "c":None, "b":"two"}
+    assert dict(store)=={"a":"uno", "c":"three"}
+    store.close()
+
+def test_compaction_under_a_reader_process(tmp_path, writer):
+    w=writer(segment_bytes=256)
+    for i in range(20): w("put", [(f"k{i}", f"value {i} "*10)])
+    store=SegmentStore(str(tmp_path/"store"), shared=True)
+    expected=dict(store); assert len(expected)==20
+    w("delete", ["k0"]); w("compact")
+    segs=store.segments()
+    assert store._head_is_base(open(store._file(segs[0]), "rb"))
+    assert dict(store)==expected   # replayed files stay readable after compaction replaced or removed them
+    assert store.refresh() is None   # the compacted log is replayed from scratch
+    del expected["k0"]
+    assert dict(store)==expected
+    w("put", [("new", "after compaction")])
+    assert store.refresh()=={"new":None} and store["new"]=="after compaction"
+    store.close()
+
+def test_reader_takes_over_when_the_writer_exits(tmp_path, writer):
+    w=writer(); w("put", [("a", "one")])
+    store=SegmentStore(str(tmp_path/"store"), shared=True)
+    assert store.refresh()=={}
+    w.close()
+    assert store.refresh() is None and not store.readonly
+    store.put_many([("b", "two")])
+    assert dict(store)=={"a":"one", "b":"two"}
+    store.close()
+
+def test_compaction_under_concurrent_reads(tmp_path):
+    store=SegmentStore(str(tmp_path/"store"), segment_bytes=512, compact_segments=1000)
+    expected={f"k{i}": f"value {i} "*20 for i in range(200)}
+    for k, v in expected.items(): store.put_many([(k, v)])
+    assert len(store.segments())>10
+    errors=[]; stop=threading.Event()
+    def read():
+        while not stop.is_set():
+            for k, v in expected.items():
+                if store[k]!=v: errors.append(k)
+    readers=[threading.Thread(target=read) for _ in range(4)]
+    for t in readers: t.start()
+    try: store.compact()
+    finally:
+        stop.set()
+        for t in readers: t.join()
+    assert not errors
+    assert len(store.segments())==2 and store.segments()[0]<store._active_id
+    with open(store._file(store.segments()[0]), "rb") as f: assert f.read(FRAME.size+1)[FRAME.size]==BASE
+    store.close()
+    store=SegmentStore(str(tmp_path/"store"))
+    assert dict(store)==expected
+    store.close()
@@ -123,8 +123,8 @@ class ChatBot {
     if (!files.length) return;
 
     // Validate
-    const valid = files.filter(f => (['application/pdf', 'text/plain'].includes(f.type)) && f.size <= 10*1024*1024);
-    if (!valid.length) { this.showError('Only PDF/TXT <= 10MB allowed.', 'warning'); event.target.value=''; return; }
+    const valid = files.filter(f => (['application/pdf', 'text/plain'].includes(f.type)) && f.size <= 100*1024*1024);
+    if (!valid.length) { this.showError('Only PDF/TXT <= 100MB allowed.', 'warning'); event.target.value=''; return; }
 
     this.updateStatus('Uploading...');
     this.disableInput();
@@ -134,8 +134,11 @@ class ChatBot {
     valid.forEach(f => formData.append('files', f));
 
     try {
-      const data = await this.uploadFormData(`${this.baseUrl}/rag/upload`, formData, (p)=>this.updateProgress(progress, p));
-      if (!data.processed_files) throw new Error('Server did not return processed_files');
+      const queued = await this.uploadFormData(`${this.baseUrl}/rag/upload`, formData, (p)=>this.updateProgress(progress, p));
+      if (!queued.job_id) throw new Error('Server did not return job_id');
+      this.updateStatus('Indexing...');
+      const data = await this.waitForJob(queued.job_id);
+      if (queued.errors) data.errors = [...queued.errors, ...(data.errors || [])];
 
       const total = data.total_chunks || 0;
       const count = Object.keys(data.processed_files).length;
@@ -157,6 +160,17 @@ class ChatBot {
     }
   }
 
+  async waitForJob(jobId, intervalMs=1000) {
+    for (;;) {
+      const job = await this.request(`/rag/jobs/${jobId}`);
+      if (job.status === 'completed' || job.status === 'failed') {
+        const failed = Object.entries(job.files || {}).filter(([, f]) => f.error).map(([fn, f]) => `${fn}: ${f.error}`);
+        return { ...job, errors: failed.length ? failed : null };
+      }
+      await new Promise(r => setTimeout(r, intervalMs));
+    }
+  }
+
   createProgress(count) {
     const el = document.createElement('div');
     el.className = 'upload-progress';